@@ -0,0 +1,170 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.dialog_settings_loader import get_dialog_settings
+from core.dialog_worker import DialogRequest
+from managers.llm_metrics import METRICS
+from managers.npc_agent import get_npc_agent
+
+
+class PrefetchEntry:
+    """Salutation générée à l'avance pour un PNJ, et l'état du jeu pour lequel elle vaut."""
+
+    def __init__(self, npc, request: DialogRequest, key: Tuple):
+        self.npc = npc
+        self.request = request
+        self.key = key
+        self.chunks: List[str] = []
+        self.result: Optional[dict] = None
+        self.error: Optional[Exception] = None
+
+
+class GreetingPrefetcher:
+    """
+    Lance la salutation du PNJ dès que le joueur entre dans sa zone d'interaction,
+    avant l'appui sur E. start_dialog la récupère instantanément si elle est prête,
+    ou reprend la requête en cours.
+
+    Le préchargement est jeté si le joueur s'éloigne, ou si l'inventaire ou les quêtes
+    changent (la clé inventaire + prompt de quêtes + taille de l'historique ne
+    correspond plus). Un délai de présence, un débit maximum par minute et un plafond
+    par session évitent de spammer l'API en longeant une rangée de PNJ.
+    """
+
+    def __init__(self, dialog_system):
+        self.dialog_system = dialog_system
+        self.game = dialog_system.game
+
+        settings = get_dialog_settings()
+        self.enabled = bool(settings.get("prefetch"))
+        self.dwell = settings.get("prefetch_dwell_ms") / 1000.0
+        self.per_minute = settings.get("prefetch_per_minute")
+        self.session_cap = settings.get("prefetch_session_cap")
+
+        self.entry: Optional[PrefetchEntry] = None
+        self.started_total = 0
+        self._recent_starts: List[float] = []
+        self._candidate = None
+        self._suppressed_npc = None
+        # PNJ dont le joueur est dans la zone -> instant d'entrée (événements du broadphase)
+        self._entered_at: Dict[Any, float] = {}
+
+    # ------------------------------------------------------------------
+    # ENTRÉES / SORTIES DE ZONE
+    # ------------------------------------------------------------------
+    def on_interaction(self, event: str, target) -> None:
+        """Abonné à InteractionBroadphase : le délai de présence part de l'entrée dans la zone."""
+        if target.kind != "npc":
+            return
+        npc = target.target.npc_ref
+        if event == "enter":
+            self._entered_at[npc] = time.perf_counter()
+        else:
+            self._entered_at.pop(npc, None)
+
+    # ------------------------------------------------------------------
+    # CHAQUE FRAME
+    # ------------------------------------------------------------------
+    def update(self):
+        g = self.game
+        npc = g.npc_to_talk
+
+        # Nouveau PNJ (ou plus aucun) : on repart de zéro
+        if npc is not self._candidate:
+            self._candidate = npc
+            self._suppressed_npc = None
+            if self.entry is not None and self.entry.npc is not npc:
+                self.discard()
+
+        if not self.enabled or npc is None or g.in_dialogue:
+            return
+
+        if self.entry is not None:
+            if self.entry.key[0] != self.game.inventory.version:
+                self.discard()
+            return
+
+        if npc is self._suppressed_npc:
+            return
+        entered_at = self._entered_at.get(npc)
+        if entered_at is None or time.perf_counter() - entered_at < self.dwell:
+            return
+        if not self._allow_start():
+            return
+
+        self._start(npc)
+
+    def on_event(self, request: DialogRequest, kind: str, payload: Any) -> bool:
+        """Événement du worker ; renvoie True s'il concernait le préchargement."""
+        entry = self.entry
+        if entry is None or request is not entry.request:
+            return False
+        if kind == "chunk":
+            entry.chunks.append(payload)
+        elif kind == "done":
+            entry.result = payload
+        else:
+            entry.error = payload
+        return True
+
+    # ------------------------------------------------------------------
+    # LANCEMENT
+    # ------------------------------------------------------------------
+    def _allow_start(self) -> bool:
+        if self.started_total >= self.session_cap:
+            return False
+        now = time.perf_counter()
+        self._recent_starts = [t for t in self._recent_starts if now - t < 60.0]
+        return len(self._recent_starts) < self.per_minute
+
+    def _state_key(self, agent, quest_prompt: str, greeting: str) -> Tuple:
+        return (self.game.inventory.version, quest_prompt, len(agent.history), greeting)
+
+    def _start(self, npc):
+        g = self.game
+
+        quest_prompt = ""
+        if g.quest_manager:
+            _, quest_prompt = g.quest_manager.handle_npc_interaction(
+                npc_name=npc.npc_name,
+                inventory=g.inventory,
+                dry_run=True,
+            )
+
+        agent = get_npc_agent(f"npc/{npc.npc_name}", quest_prompt)
+        greeting = agent.greeting_prompt()
+        request = self.dialog_system.submit_request(npc, agent, greeting, finalize_quests=True)
+
+        self.entry = PrefetchEntry(npc, request, self._state_key(agent, quest_prompt, greeting))
+        self.started_total += 1
+        self._recent_starts.append(time.perf_counter())
+        METRICS.increment(agent.npc_id, "prefetch.started")
+
+    # ------------------------------------------------------------------
+    # CONSOMMATION / ABANDON
+    # ------------------------------------------------------------------
+    def take(self, npc, agent, quest_prompt: str, greeting: str) -> Optional[PrefetchEntry]:
+        """
+        Appelé par start_dialog : renvoie le préchargement s'il correspond exactement
+        à l'état actuel, sinon le jette et renvoie None.
+        """
+        entry = self.entry
+        self._suppressed_npc = npc
+        if entry is None:
+            return None
+
+        if entry.npc is not npc or entry.error is not None or entry.key != self._state_key(agent, quest_prompt, greeting):
+            self.discard()
+            return None
+
+        self.entry = None
+        METRICS.increment(agent.npc_id, "prefetch.hit" if entry.result is not None else "prefetch.joined")
+        return entry
+
+    def discard(self):
+        entry = self.entry
+        if entry is None:
+            return
+        self.entry = None
+        self.dialog_system.worker.cancel(entry.request)
+        METRICS.increment(entry.request.agent.npc_id, "prefetch.discarded")
@@ -0,0 +1,50 @@
+import json
+import os
+
+DEFAULT_DIALOG_SETTINGS = {
+    "history_turns": 6,           # échanges gardés mot pour mot dans le prompt
+    "prompt_token_budget": 4000,  # taille maximale estimée d'une requête
+    "summary_max_tokens": 400,    # longueur maximale du résumé glissant
+    "backend": "groq",            # "groq" ou "offline" (surchargé par LLM_BACKEND)
+    "model": "llama-3.3-70b-versatile",
+    "offline_latency_ms": 400,    # backend hors ligne : délai avant le premier token
+    "offline_jitter_ms": 150,
+    "offline_tokens_per_second": 250,
+    "offline_seed": 0,
+    "cassette": None,             # fichier d'enregistrement (surchargé par LLM_CASSETTE)
+    "cassette_mode": "replay",    # "record" ou "replay" (surchargé par LLM_CASSETTE_MODE)
+    "prefetch": True,             # salutation lancée dès l'entrée dans la zone du PNJ
+    "prefetch_dwell_ms": 300,     # temps de présence dans la zone avant de lancer
+    "prefetch_per_minute": 6,
+    "prefetch_session_cap": 60,
+}
+
+
+class DialogSettingsLoader:
+    def __init__(self):
+        config_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            "config",
+            "dialog_settings.json"
+        )
+
+        self.settings = dict(DEFAULT_DIALOG_SETTINGS)
+
+        # Fichier optionnel : les valeurs par défaut suffisent
+        if os.path.isfile(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                self.settings.update(json.load(f))
+
+    def get(self, key: str):
+        return self.settings.get(key, DEFAULT_DIALOG_SETTINGS.get(key))
+
+
+_SETTINGS: DialogSettingsLoader | None = None
+
+
+def get_dialog_settings() -> DialogSettingsLoader:
+    """Réglages de dialogue, lus une seule fois par processus."""
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = DialogSettingsLoader()
+    return _SETTINGS
@@ -1,6 +1,10 @@
-import arcade
+import time
 from core.utils_text import wrap_dialog_history, count_wrapped_lines
-from managers.npc_agent import NPC_Agent
+from core.dialog_prefetch import GreetingPrefetcher
+from core.dialog_worker import DialogRequest, DialogWorker
+from managers.conversation_memory import shutdown_summaries
+from managers.llm_metrics import METRICS
+from managers.npc_agent import get_npc_agent
 
 EMOTION_MAP = {
     "tres_positive": 3,
@@ -10,20 +14,21 @@ EMOTION_MAP = {
     "tres_negative": -3,
 }
 
+# Affiche la réponse du PNJ token par token au lieu d'attendre la fin
+STREAM_REPLIES = True
+
 
 class DialogSystem:
     def __init__(self, game):
         self.game = game
+        self.worker = DialogWorker()
+        self.prefetcher = GreetingPrefetcher(self)
+        self.last_error: Exception | None = None  # dernière requête IA en échec
 
     def detect_npc(self):
         g = self.game
-        npc_zones = g.map_manager.npc_interactions
-        g.npc_to_talk = None
-
-        if npc_zones:
-            detected = arcade.check_for_collision_with_list(g.player, npc_zones)
-            if detected:
-                g.npc_to_talk = detected[0].npc_ref
+        zone = g.map_manager.interactions.nearest("npc")
+        g.npc_to_talk = zone.npc_ref if zone is not None else None
 
     def _apply_relation_from_emotion(self, npc_sprite, emotion: str):
         if not hasattr(npc_sprite, "npc_state"):
@@ -37,6 +42,9 @@ class DialogSystem:
         self.detect_npc()
         g = self.game
 
+        self.process_replies()
+        self.prefetcher.update()
+
         # Position bulle
         if g.npc_to_talk and not g.in_dialogue:
             cam_x, cam_y = g.camera.position
@@ -45,6 +53,21 @@ class DialogSystem:
             g.bubble_sprite.center_x = g.player.center_x - cam_x + win_w / 2
             g.bubble_sprite.center_y = g.player.center_y - cam_y + win_h / 2 + 50
 
+    def process_replies(self):
+        """Applique les réponses IA arrivées depuis la dernière frame."""
+        g = self.game
+        for request, kind, payload in self.worker.poll():
+            if self.prefetcher.on_event(request, kind, payload):
+                continue
+            if request is not g.dialog_pending:
+                continue
+            if kind == "chunk":
+                self._on_chunk(request, payload)
+            elif kind == "done":
+                self._on_reply(request, payload)
+            else:
+                self._on_error(request, payload)
+
     def start_dialog(self, npc):
         g = self.game
 
@@ -61,30 +84,32 @@ class DialogSystem:
                 inventory=g.inventory,
             )
 
-        g.npc_agent = NPC_Agent(folder, quest_prompt)
-        inv_list = list(g.inventory.keys())
-        result = g.npc_agent.start_dialog(inv_list)
-        first_message = result.get("response_text", "")
-        emotion = result.get("emotion", "neutre")
-        self._apply_relation_from_emotion(npc, emotion)
+        g.npc_agent = get_npc_agent(folder, quest_prompt)
 
+        g.dialog_history = []
+        g.dialog_input = ""
 
-        # --- APPLIQUER LES EFFETS DE QUÊTES APRÈS LA RÉPONSE IA ---
-        if g.quest_manager:
-            g.quest_manager.finalize_quests_after_dialog(
-                npc_name=npc.npc_name,
-                inventory=g.inventory,
-            )
+        # Salutation déjà préchargée pendant l'approche : prête ou encore en vol
+        greeting = g.npc_agent.greeting_prompt()
+        entry = self.prefetcher.take(npc, g.npc_agent, quest_prompt, greeting)
 
-        g.dialog_history = [(npc.npc_name.capitalize(), first_message)]
-        g.dialog_input = ""
+        if entry is None:
+            # Les effets de quêtes seront appliqués APRÈS la réponse IA
+            self._submit(greeting, finalize_quests=True)
+            return
+
+        g.dialog_pending = entry.request
+        if entry.chunks:
+            self._on_chunk(entry.request, "".join(entry.chunks))
+        if entry.result is not None:
+            self._on_reply(entry.request, entry.result)
 
 
     def send_player_message(self):
         g = self.game
         msg = g.dialog_input.strip()
 
-        if not msg:
+        if not msg or g.dialog_pending:
             return
 
         g.dialog_history.append(("Vous", msg))
@@ -98,31 +123,135 @@ class DialogSystem:
             if quest_prompt:
                 g.npc_agent.quest_context = quest_prompt
 
-        # Réponse IA (JSON)
-        result = g.npc_agent.ask(
-            player_message=msg,
-            inventory_list=list(g.inventory.keys())
+        g.dialog_input = ""
+        g.dialog_scroll = 0
+
+        self._submit(msg)
+
+    # ------------------------------------------------------------
+    # Requêtes asynchrones
+    # ------------------------------------------------------------
+
+    def submit_request(self, npc, agent, message: str, finalize_quests: bool = False) -> DialogRequest:
+        """Construit le prompt ici (thread principal), l'appel IA part sur le worker."""
+        g = self.game
+        messages = agent.build_messages(message, list(g.inventory.keys()))
+
+        request = DialogRequest(
+            npc=npc,
+            agent=agent,
+            player_message=message,
+            finalize_quests=finalize_quests,
         )
+        if STREAM_REPLIES:
+            return self.worker.submit_stream(request, agent.stream, messages)
+        return self.worker.submit(request, agent.complete, messages)
+
+    def _submit(self, message: str, finalize_quests: bool = False):
+        g = self.game
+        g.dialog_pending = self.submit_request(g.current_npc, g.npc_agent, message, finalize_quests)
+
+    def _on_chunk(self, request: DialogRequest, text: str):
+        g = self.game
+        speaker = request.npc.npc_name.capitalize()
 
+        if request.history_index is None:
+            request.history_index = len(g.dialog_history)
+            g.dialog_history.append((speaker, text))
+        else:
+            _, current = g.dialog_history[request.history_index]
+            g.dialog_history[request.history_index] = (speaker, current + text)
+        g.dialog_scroll = 0
+
+    def _on_reply(self, request: DialogRequest, result: dict):
+        g = self.game
+        g.dialog_pending = None
+
+        # Aller-retour complet vu du jeu (file + fournisseur + retour sur le thread principal)
+        METRICS.observe(request.agent.npc_id, "roundtrip_ms", (time.perf_counter() - request.submitted_at) * 1000.0)
+
+        npc = request.npc
         npc_response_text = result.get("response_text", "")
         emotion = result.get("emotion", "neutre")
 
+        request.agent.remember(request.player_message, npc_response_text)
+
         # Met à jour la relation du PNJ
-        if g.current_npc:
-            self._apply_relation_from_emotion(g.current_npc, emotion)
+        self._apply_relation_from_emotion(npc, emotion)
 
+        # --- APPLIQUER LES EFFETS DE QUÊTES APRÈS LA RÉPONSE IA ---
+        if request.finalize_quests and g.quest_manager:
+            g.quest_manager.finalize_quests_after_dialog(
+                npc_name=npc.npc_name,
+                inventory=g.inventory,
+            )
 
-        g.dialog_history.append((g.current_npc.npc_name.capitalize(), npc_response_text))
-        g.dialog_input = ""
+        # Le texte final remplace l'aperçu streamé
+        line = (npc.npc_name.capitalize(), npc_response_text)
+        if request.history_index is None:
+            g.dialog_history.append(line)
+        else:
+            g.dialog_history[request.history_index] = line
         g.dialog_scroll = 0
 
+    def _on_error(self, request: DialogRequest, error: Exception):
+        g = self.game
+        g.dialog_pending = None
+        self.last_error = error
+        print(f"[DIALOG] {request.npc.npc_name} : échec de la requête IA ({error!r})")
+        METRICS.increment(request.agent.npc_id, "errors")
+
+        line = (request.npc.npc_name.capitalize(), "...")
+        if request.history_index is None:
+            g.dialog_history.append(line)
+        else:
+            g.dialog_history[request.history_index] = line
+
+    def cancel_pending(self) -> bool:
+        """
+        Annule la requête en cours (ESC). Le message du joueur revient dans le champ
+        de saisie. Renvoie True si une requête a été annulée.
+        """
+        g = self.game
+        request = g.dialog_pending
+        if request is None:
+            return False
+
+        self.worker.cancel(request)
+        g.dialog_pending = None
+
+        # Retire le début de réponse déjà streamé
+        if request.history_index is not None:
+            del g.dialog_history[request.history_index:]
+
+        if not request.finalize_quests and g.dialog_history and g.dialog_history[-1] == ("Vous", request.player_message):
+            g.dialog_history.pop()
+            g.dialog_input = request.player_message
+        return True
+
+    def visible_history(self):
+        """Historique affiché : ajoute une ligne d'attente tant que le PNJ réfléchit."""
+        g = self.game
+        request = g.dialog_pending
+        if request is None or request.history_index is not None:
+            return g.dialog_history
+
+        dots = "." * (1 + int(time.perf_counter() * 3) % 3)
+        pending_line = (request.npc.npc_name.capitalize(), f"{dots}  (Échap pour annuler)")
+        return g.dialog_history + [pending_line]
+
+    def shutdown(self):
+        self.prefetcher.discard()
+        self.worker.shutdown()
+        shutdown_summaries()
+
 
     def scroll(self, dy):
         g = self.game
 
         win_w, win_h = g.get_size()
         box_width = win_w - 100
-        total_lines = count_wrapped_lines(g.dialog_history, box_width - 40, font_size=18)
+        total_lines = count_wrapped_lines(self.visible_history(), box_width - 40, font_size=18)
 
         history_height = int(win_h * 0.40) - 80
         line_height = 24
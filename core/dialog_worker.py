@@ -0,0 +1,100 @@
+import itertools
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+from managers.llm_metrics import METRICS
+
+
+_REQUEST_IDS = itertools.count(1)
+
+
+class DialogCancelled(Exception):
+    """Levée dans le thread de travail pour interrompre un flux annulé."""
+
+
+@dataclass
+class DialogRequest:
+    """
+    Une requête de dialogue envoyée au LLM.
+    Tout ce qui est nécessaire pour appliquer la réponse sur le thread principal
+    (PNJ, agent, message du joueur) voyage avec elle.
+    """
+    npc: Any
+    agent: Any
+    player_message: str
+    finalize_quests: bool = False
+    id: int = field(default_factory=lambda: next(_REQUEST_IDS))
+    submitted_at: float = field(default_factory=time.perf_counter)
+    started_at: Optional[float] = None
+    cancelled: bool = False
+    future: Any = None
+    history_index: Optional[int] = None  # ligne de dialog_history remplie par le streaming
+
+
+class DialogWorker:
+    """
+    Exécute les appels LLM hors du thread de rendu.
+    Les résultats reviennent par une file thread-safe vidée dans Game.on_update.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dialog")
+        self.completions: "queue.SimpleQueue[Tuple[DialogRequest, str, Any]]" = queue.SimpleQueue()
+
+    def submit(self, request: DialogRequest, fn: Callable, *args) -> DialogRequest:
+        request.future = self.executor.submit(self._run, request, fn, args, False)
+        return request
+
+    def submit_stream(self, request: DialogRequest, fn: Callable, *args) -> DialogRequest:
+        """
+        Comme submit(), mais fn reçoit en dernier argument un callback on_text :
+        chaque morceau est publié dans la file sous forme d'événement "chunk".
+        """
+        request.future = self.executor.submit(self._run, request, fn, args, True)
+        return request
+
+    def _run(self, request: DialogRequest, fn: Callable, args, stream: bool) -> None:
+        if request.cancelled:
+            return
+        request.started_at = time.perf_counter()
+        METRICS.observe(request.agent.npc_id, "queue_ms", (request.started_at - request.submitted_at) * 1000.0)
+
+        if stream:
+            def on_text(text: str) -> None:
+                # Interrompt la lecture du flux (et la connexion) dès l'annulation
+                if request.cancelled:
+                    raise DialogCancelled()
+                self.completions.put((request, "chunk", text))
+
+            args = (*args, on_text)
+
+        try:
+            result = fn(*args)
+        except Exception as exc:
+            self.completions.put((request, "error", exc))
+            return
+        self.completions.put((request, "done", result))
+
+    def cancel(self, request: DialogRequest) -> None:
+        """Le résultat sera ignoré ; si l'appel n'a pas commencé, il n'aura jamais lieu."""
+        request.cancelled = True
+        if request.future is not None:
+            request.future.cancel()
+
+    def poll(self) -> List[Tuple[DialogRequest, str, Any]]:
+        """Vide la file sans bloquer. Les requêtes annulées sont filtrées."""
+        events = []
+        while True:
+            try:
+                event = self.completions.get_nowait()
+            except queue.Empty:
+                break
+            if not event[0].cancelled:
+                events.append(event)
+        return events
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,12 +1,15 @@
 import arcade
 
-from managers.map_manager import MapManager
+from managers.map_manager import DEFAULT_NPC_SCALE, MapManager
 from managers.quest_manager import QuestManager
 from managers.player import Player
+from managers.texture_manager import ITEM_TEXTURE_DIR, NPC_TEXTURE_DIR, TEXTURES
 
 from core.camera_system import CameraSystem
 from core.dialog_system import DialogSystem
+from core.inventory_feed import Inventory
 from core.inventory_system import InventorySystem
+from core.inventory_view import InventoryView
 from core.transitions import TransitionSystem
 from core.input_system import InputSystem
 from core.ui_drawer import UIDrawer
@@ -35,6 +38,7 @@ class Game(arcade.Window):
 
         self.player = Player(scale=1.0)
         self.map_manager = MapManager(self)
+        self.map_manager.interactions.subscribe(self.dialog_system.prefetcher.on_interaction)
         self.quest_manager = QuestManager()
 
         self.map_settings = MapSettingsLoader()
@@ -43,12 +47,16 @@ class Game(arcade.Window):
         self.default_zoom = 1.0
         self.default_player_scale = 1.1
 
-        self.inventory = {}
+        self.inventory = Inventory()
+        self.quest_manager.track_inventory(self.inventory)
         self.item_to_pick = None
         self.inventory_open = False
         self.inventory_slot_size = 64
         self.inventory_padding = 12
 
+        self.load_sprite_textures()
+        self.inventory_view = InventoryView(self)
+
         self.bubble_texture = arcade.make_soft_square_texture(
             64,
             color=(0, 0, 0, 180),
@@ -70,15 +78,28 @@ class Game(arcade.Window):
         self.dialog_scroll = 0
         self.current_npc = None
         self.npc_to_talk = None
+        self.npc_agent = None
+        self.dialog_pending = None  # DialogRequest en vol, None sinon
 
         self.transition_alpha = 0.0
         self.transition_target = 0.0
-        self.transition_speed = 10.0
+        self.transition_speed = 600.0  # alpha par seconde
         self.transition_callback = None
+        self.transition_ready = None
 
         self.pressed_keys = set()
 
 
+    def load_sprite_textures(self):
+        """Textures des PNJ, objets et joueur : décodées une fois, à leur taille d'affichage, dans un atlas dédié."""
+        zooms = [s.get("zoom", self.default_zoom) for s in self.map_settings.settings.values()]
+        TEXTURES.max_zoom = max([self.default_zoom, *zooms]) * self.get_pixel_ratio()
+
+        TEXTURES.preload((NPC_TEXTURE_DIR,), scale=DEFAULT_NPC_SCALE)
+        TEXTURES.preload((ITEM_TEXTURE_DIR,), display_px=self.inventory_slot_size * 0.8)
+        TEXTURES.create_atlas(self.ctx)
+
+
     def setup(self):
         self.map_manager.load_map("village", "spawn_player", self.player)
         self.apply_map_settings("village")
@@ -102,12 +123,14 @@ class Game(arcade.Window):
 
 
     def on_update(self, dt):
+        self.map_manager.update_loading()
         self.input_system.update_movement(dt)
         self.camera_system.update()
+        self.map_manager.interactions.update(self.player)
         self.inventory_system.update()
         self.dialog_system.update()
         self.transition_system.update()      
-        self.transition_system.update_fade()  
+        self.transition_system.update_fade(dt)
 
         # map transitions triggered by E
         if arcade.key.E in self.pressed_keys:
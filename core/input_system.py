@@ -1,42 +1,81 @@
 import arcade
 
+# Simulation à pas fixe : le déplacement ne dépend plus de la fréquence d'affichage.
+# player_speed reste exprimé en pixels par pas de 1/60 s.
+SIMULATION_HZ = 60
+SIMULATION_STEP = 1.0 / SIMULATION_HZ
+MAX_STEPS_PER_FRAME = 5  # au-delà (gros ralentissement), le retard est abandonné
+
+
 class InputSystem:
     def __init__(self, game):
         self.game = game
+        self.accumulator = 0.0
 
     def update_movement(self, dt):
         g = self.game
 
         if g.in_dialogue or g.inventory_open:
+            self.accumulator = 0.0
+            g.player.teleport(g.player.sim_x, g.player.sim_y)
             return
 
-        g.player.remember_position()
-        g.player.change_x = 0
-        g.player.change_y = 0
+        self.accumulator += dt
+        steps = 0
+        while self.accumulator >= SIMULATION_STEP and steps < MAX_STEPS_PER_FRAME:
+            self.step()
+            self.accumulator -= SIMULATION_STEP
+            steps += 1
+        if steps == MAX_STEPS_PER_FRAME:
+            self.accumulator = min(self.accumulator, SIMULATION_STEP)
+
+        g.player.interpolate(self.accumulator / SIMULATION_STEP)
+        g.player.update_animation(dt)
+
+    def step(self):
+        """Un pas de simulation : direction lue au clavier, déplacement balayé contre les murs."""
+        g = self.game
+        player = g.player
+
+        player.begin_step()
+        player.change_x = 0
+        player.change_y = 0
 
         speed = g.player_speed
 
         if arcade.key.UP in g.pressed_keys or arcade.key.Z in g.pressed_keys:
-            g.player.change_y += speed
+            player.change_y += speed
         if arcade.key.DOWN in g.pressed_keys or arcade.key.S in g.pressed_keys:
-            g.player.change_y -= speed
+            player.change_y -= speed
         if arcade.key.LEFT in g.pressed_keys or arcade.key.Q in g.pressed_keys:
-            g.player.change_x -= speed
+            player.change_x -= speed
         if arcade.key.RIGHT in g.pressed_keys or arcade.key.D in g.pressed_keys:
-            g.player.change_x += speed
-
-        g.player.update()
-        g.player.update_animation(dt)
-
-        if arcade.check_for_collision_with_list(g.player, g.map_manager.walls):
-            g.player.center_x = g.player.previous_x
-            g.player.center_y = g.player.previous_y
+            player.change_x += speed
+
+        if player.change_x or player.change_y:
+            dx, dy = player.change_x, player.change_y
+            box = player.collision_box()
+            left, bottom, right, top = box
+
+            # Aucune cellule bloquée sous la zone balayée : le balayage exact ne
+            # raccourcirait rien, on s'en passe (cas le plus courant, loin des murs)
+            occupancy = g.map_manager.occupancy
+            if occupancy is None or occupancy.box_blocked(
+                min(left, left + dx), min(bottom, bottom + dy),
+                max(right, right + dx), max(top, top + dy),
+            ):
+                dx, dy = g.map_manager.wall_index.sweep(box, dx, dy)
+            player.sim_x += dx
+            player.sim_y += dy
 
     def on_key_press(self, key, modifiers):
         g = self.game
 
         if key == arcade.key.ESCAPE:
             if g.in_dialogue:
+                # Première pression : annule la réponse IA en attente
+                if g.dialog_system.cancel_pending() and g.dialog_history:
+                    return
                 g.in_dialogue = False
                 return
             arcade.exit()
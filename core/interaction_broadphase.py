@@ -0,0 +1,130 @@
+from typing import Callable, Dict, List
+
+import arcade
+
+from core.spatial_hash import StaticSpatialHash
+from core.volumes import Volume
+
+# Ordre de priorité quand plusieurs cibles se chevauchent (plus petit = prioritaire)
+INTERACTION_PRIORITY = {
+    "npc": 0,
+    "item": 1,
+    "transition": 2,
+}
+
+# listener(événement "enter" / "exit", cible)
+InteractionListener = Callable[[str, "Interactable"], None]
+
+
+class Interactable:
+    """
+    Une cible d'interaction de la map : zone de PNJ, objet ramassable ou transition.
+    `target` est un Volume (test de boîtes) ou un sprite (test de hitbox arcade).
+    """
+
+    __slots__ = ("kind", "target", "priority", "alive")
+
+    def __init__(self, kind: str, target):
+        self.kind = kind
+        self.target = target
+        self.priority = INTERACTION_PRIORITY.get(kind, len(INTERACTION_PRIORITY))
+        self.alive = True
+
+    def touches(self, player: arcade.Sprite) -> bool:
+        if isinstance(self.target, Volume):
+            return self.target.overlaps_sprite(player)
+        return arcade.check_for_collision(player, self.target)
+
+
+class InteractionBroadphase:
+    """
+    Toutes les cibles d'interaction d'une map dans un seul index spatial.
+
+    update() fait UNE requête par frame autour du joueur : les cibles touchées sont
+    classées par priorité puis par distance, et les entrées / sorties de zone sont
+    signalées aux abonnés. Les systèmes (dialogue, inventaire, transitions) lisent
+    ensuite nearest(kind) au lieu de parcourir chacun leur liste.
+    """
+
+    def __init__(self, cell_size: float = 64.0):
+        self.cell_size = cell_size
+        self.index = StaticSpatialHash(cell_size)
+        self.nearby: List[Interactable] = []
+        self._nearest: Dict[str, Interactable] = {}
+        self._by_target: Dict[int, Interactable] = {}
+        self._listeners: List[InteractionListener] = []
+
+    # ------------------------------------------------------------------
+    # CONSTRUCTION (AU CHARGEMENT DE LA MAP)
+    # ------------------------------------------------------------------
+    def rebuild(self, npc_zones, items, transitions) -> None:
+        self.index = StaticSpatialHash(self.cell_size)
+        self._by_target = {}
+        for kind, objects in (("npc", npc_zones), ("item", items), ("transition", transitions)):
+            for obj in objects:
+                target = Interactable(kind, obj)
+                self.index.insert(obj.left, obj.bottom, obj.right, obj.top, target)
+                self._by_target[id(obj)] = target
+
+    def remove(self, obj) -> None:
+        """Retire une cible (objet ramassé) : elle reste dans l'index mais est ignorée."""
+        target = self._by_target.pop(id(obj), None)
+        if target is None:
+            return
+        target.alive = False
+        if target in self.nearby:
+            self.nearby.remove(target)
+            if self._nearest.get(target.kind) is target:
+                del self._nearest[target.kind]
+                for other in self.nearby:
+                    if other.kind == target.kind:
+                        self._nearest[target.kind] = other
+                        break
+            self._emit("exit", target)
+
+    def subscribe(self, listener: InteractionListener) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    # ------------------------------------------------------------------
+    # CHAQUE FRAME
+    # ------------------------------------------------------------------
+    def update(self, player: arcade.Sprite) -> None:
+        px, py = player.center_x, player.center_y
+
+        hits = [
+            target for target in self.index.query_sprite(player)
+            if target.alive and target.touches(player)
+        ]
+        hits.sort(key=lambda t: (
+            t.priority,
+            (t.target.center_x - px) ** 2 + (t.target.center_y - py) ** 2,
+        ))
+
+        previous = self.nearby
+        self.nearby = hits
+        self._nearest = {}
+        for target in hits:
+            self._nearest.setdefault(target.kind, target)
+
+        if self._listeners:
+            before = {id(t) for t in previous}
+            now = {id(t) for t in hits}
+            for target in previous:
+                if id(target) not in now:
+                    self._emit("exit", target)
+            for target in hits:
+                if id(target) not in before:
+                    self._emit("enter", target)
+
+    def _emit(self, event: str, target: Interactable) -> None:
+        for listener in list(self._listeners):
+            listener(event, target)
+
+    # ------------------------------------------------------------------
+    # LECTURE
+    # ------------------------------------------------------------------
+    def nearest(self, kind: str):
+        """Cible (volume ou sprite) la plus proche de ce type touchée par le joueur à cette frame."""
+        target = self._nearest.get(kind)
+        return target.target if target is not None else None
@@ -0,0 +1,91 @@
+from typing import Callable, List
+
+# listener(item_id, ancienne quantité, nouvelle quantité)
+InventoryListener = Callable[[str, int, int], None]
+
+
+class Inventory(dict):
+    """
+    Inventaire du joueur : un dict {item_id: quantité} qui publie chaque variation.
+
+    Toute modification (add/remove, inventory[x] = n, del inventory[x]...) incrémente
+    `version` et prévient les abonnés avec l'ancienne et la nouvelle quantité, ce qui
+    permet aux systèmes dépendants (quêtes, UI) de ne recalculer que ce qui a changé.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.version = 0
+        self._listeners: List[InventoryListener] = []
+        self.update(*args, **kwargs)
+
+    # ------------------------------------------------------------------
+    # ABONNEMENTS
+    # ------------------------------------------------------------------
+    def subscribe(self, listener: InventoryListener) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: InventoryListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, item_id: str, old: int, new: int) -> None:
+        if old == new:
+            return
+        self.version += 1
+        for listener in list(self._listeners):
+            listener(item_id, old, new)
+
+    # ------------------------------------------------------------------
+    # MODIFICATIONS
+    # ------------------------------------------------------------------
+    def add(self, item_id: str, count: int = 1) -> int:
+        """Ajoute `count` exemplaires et renvoie la nouvelle quantité."""
+        self[item_id] = self.get(item_id, 0) + count
+        return self.get(item_id, 0)
+
+    def remove(self, item_id: str, count: int = 1) -> int:
+        """Retire `count` exemplaires (l'entrée disparaît à 0) et renvoie la quantité restante."""
+        return self.add(item_id, -count)
+
+    def __setitem__(self, item_id: str, count: int) -> None:
+        old = self.get(item_id, 0)
+        if count <= 0:
+            if item_id in self:
+                super().__delitem__(item_id)
+            count = 0
+        else:
+            super().__setitem__(item_id, count)
+        self._emit(item_id, old, count)
+
+    def __delitem__(self, item_id: str) -> None:
+        old = self[item_id]
+        super().__delitem__(item_id)
+        self._emit(item_id, old, 0)
+
+    def pop(self, item_id: str, *default):
+        if item_id not in self:
+            if default:
+                return default[0]
+            raise KeyError(item_id)
+        count = self[item_id]
+        del self[item_id]
+        return count
+
+    def setdefault(self, item_id: str, default: int = 0) -> int:
+        if item_id not in self:
+            self[item_id] = default
+        return self.get(item_id, 0)
+
+    def update(self, *args, **kwargs) -> None:
+        for item_id, count in dict(*args, **kwargs).items():
+            self[item_id] = count
+
+    def clear(self) -> None:
+        for item_id in list(self):
+            del self[item_id]
+
+    def popitem(self):
+        item_id = next(reversed(self))
+        return item_id, self.pop(item_id)
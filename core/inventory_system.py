@@ -1,16 +1,12 @@
-import arcade
-
 class InventorySystem:
     def __init__(self, game):
         self.game = game
 
     def detect_item_pick(self):
         g = self.game
-        hits = arcade.check_for_collision_with_list(g.player, g.map_manager.items)
-
-        if hits:
-            nearest = hits[0]
+        nearest = g.map_manager.interactions.nearest("item")
 
+        if nearest is not None:
             cam_x, cam_y = g.camera.position
             win_w, win_h = g.get_size()
 
@@ -25,8 +21,8 @@ class InventorySystem:
         g = self.game
         if g.item_to_pick:
             item = g.item_to_pick
-            g.inventory[item.item_id] = g.inventory.get(item.item_id, 0) + 1
-            item.remove_from_sprite_lists()
+            g.inventory.add(item.item_id)
+            g.map_manager.take_item(item)
             print(f"Ramassé : {item.item_id} → inventaire : {g.inventory}")
 
     def update(self):
@@ -0,0 +1,133 @@
+import os
+from typing import Dict, Optional, Set, Tuple
+
+import arcade
+import pyglet
+
+from managers.texture_manager import ITEM_TEXTURE_DIR, TEXTURES
+
+PANEL_WIDTH = 600
+PANEL_HEIGHT = 400
+SLOTS_PER_ROW = 4
+ICON_RATIO = 0.8  # taille de l'icône par rapport à la case
+
+
+class InventoryView:
+    """
+    Panneau d'inventaire en mode retenu.
+
+    Formes, icônes et textes sont construits une fois puis redessinés tels quels.
+    L'inventaire (Inventory) prévient la vue à chaque variation : un changement de
+    quantité ne réécrit que le texte de la case concernée, l'ajout ou la disparition
+    d'un objet reconstruit la disposition. Rien n'est recalculé tant que rien ne change.
+    """
+
+    def __init__(self, game):
+        self.game = game
+
+        self.shapes: Optional[arcade.shape_list.ShapeElementList] = None
+        self.icons = TEXTURES.sprite_list()
+        self.batch = pyglet.graphics.Batch()
+        self.counts: Dict[str, arcade.Text] = {}
+
+        self._size: Tuple[int, int] = (0, 0)
+        self._layout_dirty = True
+        self._dirty_counts: Set[str] = set()
+
+        game.inventory.subscribe(self.on_inventory_changed)
+
+    # ------------------------------------------------------------------
+    # SIGNAL INVENTAIRE
+    # ------------------------------------------------------------------
+    def on_inventory_changed(self, item_id: str, old: int, new: int) -> None:
+        if old == 0 or new == 0:
+            self._layout_dirty = True
+        else:
+            self._dirty_counts.add(item_id)
+
+    # ------------------------------------------------------------------
+    # MISE À JOUR
+    # ------------------------------------------------------------------
+    def _sync(self) -> None:
+        size = self.game.get_size()
+        if self._layout_dirty or size != self._size:
+            self._size = size
+            self._rebuild()
+        elif self._dirty_counts:
+            inventory = self.game.inventory
+            for item_id in self._dirty_counts:
+                text = self.counts.get(item_id)
+                if text is not None:
+                    text.text = str(inventory.get(item_id, 0))
+
+        self._layout_dirty = False
+        self._dirty_counts.clear()
+
+    def _rebuild(self) -> None:
+        g = self.game
+        win_w, win_h = self._size
+        x = (win_w - PANEL_WIDTH) / 2
+        y = (win_h - PANEL_HEIGHT) / 2
+        slot = g.inventory_slot_size
+        pad = g.inventory_padding
+        icon_px = slot * ICON_RATIO
+
+        shapes = arcade.shape_list.ShapeElementList()
+        shapes.append(arcade.shape_list.create_rectangle_filled(
+            x + PANEL_WIDTH / 2, y + PANEL_HEIGHT / 2, PANEL_WIDTH, PANEL_HEIGHT, (20, 20, 20, 230)
+        ))
+        shapes.append(arcade.shape_list.create_rectangle_outline(
+            x + PANEL_WIDTH / 2, y + PANEL_HEIGHT / 2, PANEL_WIDTH, PANEL_HEIGHT, arcade.color.WHITE, 3
+        ))
+
+        self.icons.clear()
+        self.batch = pyglet.graphics.Batch()
+        self.counts = {}
+
+        arcade.Text(
+            "Inventaire",
+            x + PANEL_WIDTH / 2,
+            y + PANEL_HEIGHT - 40,
+            arcade.color.WHITE,
+            28,
+            anchor_x="center",
+            batch=self.batch,
+        )
+
+        for index, (item_name, quantity) in enumerate(g.inventory.items()):
+            row, col = divmod(index, SLOTS_PER_ROW)
+            sx = x + 40 + col * (slot + pad)
+            sy = y + PANEL_HEIGHT - 120 - row * (slot + pad)
+            cx, cy = sx + slot / 2, sy + slot / 2
+
+            shapes.append(arcade.shape_list.create_rectangle_filled(cx, cy, slot, slot, (60, 60, 60, 200)))
+            shapes.append(arcade.shape_list.create_rectangle_outline(cx, cy, slot, slot, arcade.color.WHITE, 2))
+
+            texture_path = os.path.join(ITEM_TEXTURE_DIR, f"{item_name}.png")
+            icon = arcade.Sprite(TEXTURES.get(texture_path, icon_px))
+            icon.center_x = cx
+            icon.center_y = cy
+            icon.width = icon_px
+            icon.height = icon_px
+            self.icons.append(icon)
+
+            self.counts[item_name] = arcade.Text(
+                str(quantity),
+                sx + slot - 10,
+                sy + 5,
+                arcade.color.WHITE,
+                14,
+                anchor_x="right",
+                batch=self.batch,
+            )
+
+        self.shapes = shapes
+
+    # ------------------------------------------------------------------
+    # RENDU
+    # ------------------------------------------------------------------
+    def draw(self) -> None:
+        self._sync()
+        self.shapes.draw()
+        self.icons.draw()
+        self.batch.draw()
@@ -0,0 +1,110 @@
+# core/json_stream.py
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class ResponseTextScanner:
+    """
+    Scanner JSON incrémental : on lui donne les tokens du LLM au fur et à mesure,
+    il renvoie les nouveaux caractères de la valeur `field` (par défaut response_text)
+    dès qu'ils arrivent, sans attendre la fin de l'objet.
+
+    Seules les clés de premier niveau sont suivies. Tout ce qui précède le premier
+    '{' (```json par exemple) est ignoré. `closed` passe à True quand l'objet se ferme.
+    """
+
+    def __init__(self, field: str = "response_text"):
+        self.field = field
+        self.depth = 0
+        self.closed = False
+
+        self._in_string = False
+        self._escape = None          # None, ou les caractères lus après un '\'
+        self._expect_key = False
+        self._string_is_key = False
+        self._streaming = False
+        self._key_buf = []
+        self._current_key = None
+
+    def feed(self, chunk: str) -> str:
+        """Consomme un morceau de texte brut, renvoie le texte décodé nouvellement visible."""
+        out = []
+
+        for ch in chunk:
+            if self.closed:
+                break
+
+            if self._in_string:
+                if self._escape is not None:
+                    self._escape += ch
+                    decoded = self._decode_escape()
+                    if decoded is None:
+                        continue
+                    self._escape = None
+                    self._string_char(decoded, out)
+                elif ch == "\\":
+                    self._escape = ""
+                elif ch == '"':
+                    self._end_string()
+                else:
+                    self._string_char(ch, out)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_is_key = self.depth == 1 and self._expect_key
+                self._streaming = (
+                    not self._string_is_key
+                    and self.depth == 1
+                    and self._current_key == self.field
+                )
+                self._key_buf = []
+            elif ch in "{[":
+                self.depth += 1
+                if self.depth == 1:
+                    self._expect_key = ch == "{"
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0 and ch == "}":
+                    self.closed = True
+            elif self.depth == 1:
+                if ch == ",":
+                    self._expect_key = True
+                elif ch == ":":
+                    self._expect_key = False
+
+        return "".join(out)
+
+    # ------------------------------------------------------------------
+    def _decode_escape(self):
+        """Renvoie le caractère échappé, ou None s'il manque encore des caractères."""
+        esc = self._escape
+        if esc[0] != "u":
+            return _ESCAPES.get(esc[0], esc[0])
+        if len(esc) < 5:
+            return None
+        try:
+            return chr(int(esc[1:5], 16))
+        except ValueError:
+            return ""
+
+    def _string_char(self, ch: str, out: list) -> None:
+        if self._string_is_key:
+            self._key_buf.append(ch)
+        elif self._streaming:
+            out.append(ch)
+
+    def _end_string(self) -> None:
+        self._in_string = False
+        if self._string_is_key:
+            self._current_key = "".join(self._key_buf)
+        self._streaming = False
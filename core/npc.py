@@ -1,3 +1,4 @@
+import threading
 from dataclasses import dataclass
 from typing import Dict
 
@@ -13,12 +14,14 @@ class NPC:
 
 # Petit registre global : on garde 1 état par PNJ (par nom)
 _NPC_REGISTRY: Dict[str, NPC] = {}
+_NPC_REGISTRY_LOCK = threading.Lock()  # les maps sont aussi construites sur un thread de fond
 
 def get_npc_state(name: str) -> NPC:
     """
     Récupère (ou crée) l'état persistant d'un PNJ, normalisé par son nom.
     """
     key = (name or "").lower()
-    if key not in _NPC_REGISTRY:
-        _NPC_REGISTRY[key] = NPC(name=name)
-    return _NPC_REGISTRY[key]
+    with _NPC_REGISTRY_LOCK:
+        if key not in _NPC_REGISTRY:
+            _NPC_REGISTRY[key] = NPC(name=name)
+        return _NPC_REGISTRY[key]
@@ -0,0 +1,51 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+class OccupancyGrid:
+    """
+    Grille booléenne NumPy des zones bloquées d'une map (True = mur).
+
+    Rastérisation conservatrice : toute cellule touchée par un mur, même sur un bord
+    ou par un mur plus fin qu'une cellule, est bloquée. Une zone libre dans la grille
+    est donc libre pour le balayage exact de StaticSpatialHash (mêmes boîtes).
+    Tout ce qui est hors de la map est considéré comme bloqué.
+
+    cells[row, col] : row 0 en bas (y croissant vers le haut, comme arcade).
+    """
+
+    def __init__(self, width: float, height: float, cell_size: float):
+        self.cell_size = float(cell_size)
+        self.cols = max(1, math.ceil(width / self.cell_size))
+        self.rows = max(1, math.ceil(height / self.cell_size))
+        self.cells = np.zeros((self.rows, self.cols), dtype=bool)
+
+    def _cell_range(self, left: float, bottom: float, right: float, top: float) -> Tuple[int, int, int, int]:
+        """Cellules [c0, c1] x [r0, r1] (bornes incluses) touchées par la boîte."""
+        size = self.cell_size
+        return (
+            math.floor(left / size), math.floor(bottom / size),
+            math.floor(right / size), math.floor(top / size),
+        )
+
+    # ------------------------------------------------------------------
+    # RASTÉRISATION
+    # ------------------------------------------------------------------
+    def fill_box(self, left: float, bottom: float, right: float, top: float) -> None:
+        c0, r0, c1, r1 = self._cell_range(left, bottom, right, top)
+        c0, r0 = max(c0, 0), max(r0, 0)
+        c1, r1 = min(c1, self.cols - 1), min(r1, self.rows - 1)
+        if c0 <= c1 and r0 <= r1:
+            self.cells[r0:r1 + 1, c0:c1 + 1] = True
+
+    # ------------------------------------------------------------------
+    # REQUÊTES
+    # ------------------------------------------------------------------
+    def box_blocked(self, left: float, bottom: float, right: float, top: float) -> bool:
+        """True si une cellule touchée par la boîte est bloquée (ou si elle sort de la map)."""
+        c0, r0, c1, r1 = self._cell_range(left, bottom, right, top)
+        if c0 < 0 or r0 < 0 or c1 >= self.cols or r1 >= self.rows:
+            return True
+        return bool(self.cells[r0:r1 + 1, c0:c1 + 1].any())
@@ -0,0 +1,126 @@
+import math
+from typing import Any, Dict, List, Tuple
+
+Box = Tuple[float, float, float, float]  # (left, bottom, right, top)
+
+
+class StaticSpatialHash:
+    """
+    Index de boîtes statiques (murs d'une map) sur une grille uniforme.
+
+    Construit une seule fois au chargement de la map : chaque boîte est rangée dans
+    toutes les cellules qu'elle recouvre. Une requête ne parcourt que les cellules
+    sous la zone demandée, son coût ne dépend donc pas du nombre total de murs.
+    """
+
+    def __init__(self, cell_size: float = 64.0):
+        self.cell_size = float(cell_size)
+        self.boxes: List[Box] = []
+        self.items: List[Any] = []
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _cell_range(self, left: float, bottom: float, right: float, top: float):
+        size = self.cell_size
+        return (
+            math.floor(left / size), math.floor(bottom / size),
+            math.floor(right / size), math.floor(top / size),
+        )
+
+    # ------------------------------------------------------------------
+    # CONSTRUCTION
+    # ------------------------------------------------------------------
+    def insert(self, left: float, bottom: float, right: float, top: float, item: Any = None) -> int:
+        index = len(self.boxes)
+        self.boxes.append((left, bottom, right, top))
+        self.items.append(item)
+
+        x0, y0, x1, y1 = self._cell_range(left, bottom, right, top)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self._cells.setdefault((cx, cy), []).append(index)
+        return index
+
+    @classmethod
+    def from_objects(cls, objects, cell_size: float = 64.0) -> "StaticSpatialHash":
+        """Index d'objets ayant left / bottom / right / top (sprites, volumes)."""
+        index = cls(cell_size)
+        for obj in objects:
+            index.insert(obj.left, obj.bottom, obj.right, obj.top, obj)
+        return index
+
+    # ------------------------------------------------------------------
+    # REQUÊTES
+    # ------------------------------------------------------------------
+    def query_indices(self, left: float, bottom: float, right: float, top: float) -> List[int]:
+        """Indices des boîtes qui chevauchent ou touchent la zone."""
+        x0, y0, x1, y1 = self._cell_range(left, bottom, right, top)
+        boxes = self.boxes
+        found: List[int] = []
+        seen = set()
+
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for index in self._cells.get((cx, cy), ()):
+                    if index in seen:
+                        continue
+                    seen.add(index)
+                    b_left, b_bottom, b_right, b_top = boxes[index]
+                    if b_left <= right and left <= b_right and b_bottom <= top and bottom <= b_top:
+                        found.append(index)
+        return found
+
+    def query(self, left: float, bottom: float, right: float, top: float) -> List[Any]:
+        return [self.items[i] for i in self.query_indices(left, bottom, right, top)]
+
+    def query_sprite(self, sprite) -> List[Any]:
+        """Éléments dont la boîte touche la boîte englobante du sprite (candidats)."""
+        return self.query(sprite.left, sprite.bottom, sprite.right, sprite.top)
+
+    # ------------------------------------------------------------------
+    # DÉPLACEMENT BALAYÉ
+    # ------------------------------------------------------------------
+    def sweep(self, box: Box, dx: float, dy: float) -> Tuple[float, float]:
+        """
+        Déplacement autorisé pour une boîte mobile : X puis Y séparément, chaque axe
+        étant raccourci au premier mur rencontré. Le mouvement sur l'autre axe est
+        conservé, ce qui fait glisser le long des murs. Les murs déjà chevauchés au
+        départ sont ignorés pour ne jamais rester coincé dedans.
+        """
+        left, bottom, right, top = box
+        dx = self._sweep_axis(left, bottom, right, top, dx, horizontal=True)
+        left += dx
+        right += dx
+        dy = self._sweep_axis(left, bottom, right, top, dy, horizontal=False)
+        return dx, dy
+
+    def _sweep_axis(self, left, bottom, right, top, delta, horizontal: bool) -> float:
+        if delta == 0:
+            return 0.0
+
+        if horizontal:
+            area = (min(left, left + delta), bottom, max(right, right + delta), top)
+        else:
+            area = (left, min(bottom, bottom + delta), right, max(top, top + delta))
+
+        for index in self.query_indices(*area):
+            b_left, b_bottom, b_right, b_top = self.boxes[index]
+
+            if horizontal:
+                # Contact uniquement par un bord sur l'autre axe : on glisse
+                if b_bottom >= top or b_top <= bottom:
+                    continue
+                if delta > 0 and b_left >= right:
+                    delta = min(delta, b_left - right)
+                elif delta < 0 and b_right <= left:
+                    delta = max(delta, b_right - left)
+            else:
+                if b_left >= right or b_right <= left:
+                    continue
+                if delta > 0 and b_bottom >= top:
+                    delta = min(delta, b_bottom - top)
+                elif delta < 0 and b_top <= bottom:
+                    delta = max(delta, b_top - bottom)
+        return delta
@@ -0,0 +1,48 @@
+from typing import Dict, Hashable, Set
+
+import arcade
+import pyglet
+
+
+class TextCache:
+    """
+    Textes de l'interface en mode retenu.
+
+    Chaque emplacement (clé libre : "bubble", ("dialog", 3)...) garde son arcade.Text
+    d'une frame à l'autre, dans un batch pyglet commun : la mise en page des glyphes
+    n'est refaite que si la chaîne change, un déplacement ne fait que translater.
+    Les emplacements non demandés pendant une frame sont masqués, puis draw()
+    dessine tout le reste en un seul appel.
+    """
+
+    def __init__(self):
+        self.batch = pyglet.graphics.Batch()
+        self._texts: Dict[Hashable, arcade.Text] = {}
+        self._used: Set[Hashable] = set()
+        self._shown: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def text(self, key: Hashable, value: str, x: float, y: float,
+             color=arcade.color.WHITE, font_size: float = 18, anchor_x: str = "left") -> arcade.Text:
+        """Affiche `value` à l'emplacement `key` pour la frame en cours."""
+        text = self._texts.get(key)
+        if text is None:
+            text = arcade.Text(value, x, y, color, font_size, anchor_x=anchor_x, batch=self.batch)
+            self._texts[key] = text
+        else:
+            # arcade.Text ignore déjà les affectations identiques
+            text.text = value
+            if text.x != x or text.y != y:
+                text.position = (x, y)
+            if not text.visible:
+                text.visible = True
+        self._used.add(key)
+        return text
+
+    def draw(self) -> None:
+        for key in self._shown - self._used:
+            self._texts[key].visible = False
+        self._shown, self._used = self._used, set()
+        self.batch.draw()
@@ -1,43 +1,50 @@
-import arcade
+# Un pas de temps plus long (hitch, fenêtre déplacée) ne doit pas sauter le fondu
+MAX_FADE_STEP = 0.05
+
 
 class TransitionSystem:
     def __init__(self, game):
         self.game = game
 
-    def start_transition(self, callback):
+    def start_transition(self, callback, ready=None):
+        """
+        Fondu au noir puis callback. Si `ready` est fourni, l'écran reste noir
+        tant que ready() est faux (map encore en préparation).
+        """
         g = self.game
         if g.transition_target != 0 or g.transition_alpha != 0:
             return
         g.transition_target = 255.0
         g.transition_callback = callback
+        g.transition_ready = ready
 
-    def update_fade(self):
+    def update_fade(self, dt):
         g = self.game
 
-        if g.transition_alpha != g.transition_target:
-            if g.transition_alpha < g.transition_target:
-                g.transition_alpha += g.transition_speed
-
-                if g.transition_alpha >= g.transition_target:
-                    g.transition_alpha = g.transition_target
+        # transition_speed est en alpha par seconde
+        step = g.transition_speed * min(dt, MAX_FADE_STEP)
 
-                    if g.transition_alpha >= 255 and g.transition_callback:
-                        g.transition_callback()
-                        g.transition_callback = None
-                        g.transition_target = 0
+        if g.transition_alpha < g.transition_target:
+            g.transition_alpha = min(g.transition_alpha + step, g.transition_target)
+        elif g.transition_alpha > g.transition_target:
+            g.transition_alpha = max(g.transition_alpha - step, g.transition_target)
 
-            else:
-                g.transition_alpha -= g.transition_speed
-                if g.transition_alpha <= g.transition_target:
-                    g.transition_alpha = g.transition_target
+        if g.transition_alpha >= 255 and g.transition_callback:
+            # Écran noir : le fondu d'entrée attend que la map soit prête
+            if g.transition_ready is not None and not g.transition_ready():
+                return
+            g.transition_callback()
+            g.transition_callback = None
+            g.transition_ready = None
+            g.transition_target = 0
 
     def update(self):
         """Handle transition bubble detection + positioning."""
         g = self.game
 
-        hits = arcade.check_for_collision_with_list(g.player, g.map_manager.transitions)
+        trigger = g.map_manager.interactions.nearest("transition")
 
-        if hits and not g.in_dialogue:
+        if trigger is not None and not g.in_dialogue:
             # Position bulle de transition
             cam_x, cam_y = g.camera.position
             win_w, win_h = g.get_size()
@@ -53,25 +60,25 @@ class TransitionSystem:
     def check_map_transition(self):
         g = self.game
 
-        hits = arcade.check_for_collision_with_list(
-            g.player, g.map_manager.transitions
-        )
+        trigger = g.map_manager.interactions.nearest("transition")
 
-        if not hits or g.in_dialogue:
+        if trigger is None or g.in_dialogue:
             return
 
         if g.transition_target != 0 or g.transition_alpha != 0:
             return
 
-        trigger = hits[0]
         target_map = getattr(trigger, "target_map", None)
         target_spawn = getattr(trigger, "target_spawn", None)
 
         if not target_map or not target_spawn:
             return
 
+        # La map se prépare en fond pendant le fondu au noir, avant les voisines en attente
+        g.map_manager.prioritize(target_map)
+
         def do_change():
             g.map_manager.load_map(target_map, target_spawn, g.player)
             g.apply_map_settings(target_map)
 
-        self.start_transition(do_change)
+        self.start_transition(do_change, ready=lambda: not g.map_manager.load_pending(target_map))
@@ -1,15 +1,16 @@
-import os
 import arcade
-from core.utils_text import wrap_dialog_history
-
-ROOT_DIR = os.path.dirname(os.path.dirname(__file__))  
-ASSETS_DIR = os.path.join(ROOT_DIR, "assets", "objet")
+from core.text_cache import TextCache
+from core.utils_text import WrappedHistory
 
 
 class UIDrawer:
     def __init__(self, game):
         self.game = game
 
+        # Textes de l'interface : objets persistants, dessinés en un seul batch
+        self.texts = TextCache()
+        self.history = WrappedHistory()
+
     def draw(self):
         g = self.game
         g.clear()
@@ -24,6 +25,7 @@ class UIDrawer:
         self.draw_interaction_bubble()
         self.draw_pickup_text()
         self.draw_dialog_box()
+        self.texts.draw()
         self.draw_inventory()
 
     # ---------------------------------------------------------
@@ -43,8 +45,9 @@ class UIDrawer:
         # debug walls & transitions
         from core.game import DEBUG_COLLISION
         if DEBUG_COLLISION:
-            g.map_manager.walls.draw()
-            g.map_manager.transitions.draw()
+            g.map_manager.walls.draw((255, 0, 0, 90))
+            g.map_manager.transitions.draw((0, 255, 0, 80))
+            g.map_manager.npc_interactions.draw((0, 0, 255, 60))
 
     # ---------------------------------------------------------
     #                    FADE TRANSITION
@@ -72,7 +75,8 @@ class UIDrawer:
         # Transition bubble
         if g.show_bubble:
             g.bubble_list.draw()
-            arcade.draw_text(
+            self.texts.text(
+                "transition",
                 "Appuyez sur E",
                 g.bubble_sprite.center_x,
                 g.bubble_sprite.center_y - 7,
@@ -82,7 +86,8 @@ class UIDrawer:
 
         # NPC bubble
         if g.npc_to_talk:
-            arcade.draw_text(
+            self.texts.text(
+                "talk",
                 "Parler (E)",
                 g.bubble_sprite.center_x,
                 g.bubble_sprite.center_y - 40,
@@ -96,7 +101,8 @@ class UIDrawer:
     def draw_pickup_text(self):
         g = self.game
         if g.item_to_pick and not g.in_dialogue:
-            arcade.draw_text(
+            self.texts.text(
+                "pickup",
                 f"Ramasser {g.item_to_pick.item_id} (E)",
                 g.bubble_sprite.center_x,
                 g.bubble_sprite.center_y - 40,
@@ -137,7 +143,8 @@ class UIDrawer:
         )
 
         # User typing text
-        arcade.draw_text(
+        self.texts.text(
+            "input",
             g.dialog_input,
             input_box_x + 10,
             input_box_y + 12,
@@ -152,7 +159,7 @@ class UIDrawer:
         line_height = 24
         max_lines_on_screen = max(1, available_height // line_height)
 
-        wrapped_lines = wrap_dialog_history(g.dialog_history, box_width - 40, font_size=18)
+        wrapped_lines = self.history.update(g.dialog_system.visible_history(), box_width - 40, font_size=18)
         total_lines = len(wrapped_lines)
 
         if total_lines > 0:
@@ -165,9 +172,10 @@ class UIDrawer:
         else:
             display_lines = []
 
+        # Une ligne d'écran = un emplacement fixe : seul son texte change au défilement
         y = history_top
-        for line in display_lines:
-            arcade.draw_text(line, box_x + 20, y, arcade.color.WHITE, 18)
+        for row, line in enumerate(display_lines):
+            self.texts.text(("dialog", row), line, box_x + 20, y, arcade.color.WHITE, 18)
             y -= line_height
 
     # ---------------------------------------------------------
@@ -178,67 +186,5 @@ class UIDrawer:
         if not g.inventory_open:
             return
 
-        win_w, win_h = g.get_size()
-        width, height = 600, 400
-        x = (win_w - width) / 2
-        y = (win_h - height) / 2
-
-        # Background
-        arcade.draw_lbwh_rectangle_filled(
-            x, y, width, height,
-            (20, 20, 20, 230)
-        )
-
-        arcade.draw_lbwh_rectangle_outline(
-            x, y, width, height,
-            arcade.color.WHITE, 3
-        )
-
-        arcade.draw_text(
-            "Inventaire",
-            x + width / 2,
-            y + height - 40,
-            arcade.color.WHITE,
-            28,
-            anchor_x="center"
-        )
-
-        # Slots
-        slot = g.inventory_slot_size
-        pad = g.inventory_padding
-
-        row = 0
-        col = 0
-
-        for item_name, quantity in g.inventory.items():
-            sx = x + 40 + col * (slot + pad)
-            sy = y + height - 120 - row * (slot + pad)
-
-            arcade.draw_lbwh_rectangle_filled(sx, sy, slot, slot, (60,60,60,200))
-            arcade.draw_lbwh_rectangle_outline(sx, sy, slot, slot, arcade.color.WHITE, 2)
-
-            texture_path = os.path.join(ASSETS_DIR, f"{item_name}.png")
-            texture = arcade.load_texture(texture_path)
-
-            icon = arcade.Sprite(texture, scale=1.0)
-            icon.center_x = sx + slot / 2
-            icon.center_y = sy + slot / 2
-            icon.width = slot * 0.8
-            icon.height = slot * 0.8
-            temp_list = arcade.SpriteList()
-            temp_list.append(icon)
-            temp_list.draw()
-
-            arcade.draw_text(
-                str(quantity),
-                sx + slot - 10,
-                sy + 5,
-                arcade.color.WHITE,
-                14,
-                anchor_x="right"
-            )
-
-            col += 1
-            if col >= 4:
-                col = 0
-                row += 1
+        # Vue retenue : ne reconstruit que ce que l'inventaire a signalé comme modifié
+        g.inventory_view.draw()
@@ -1,4 +1,5 @@
 # core/utils_text.py
+import operator
 import textwrap
 
 def wrap_text_to_width(text: str, max_width_px: float, font_size: int = 18):
@@ -28,3 +29,39 @@ def wrap_dialog_history(dialog_history, max_width_px: float, font_size: int = 18
 def count_wrapped_lines(dialog_history, max_width_px: float, font_size: int = 18):
     """Nombre total de lignes une fois le wrapping appliqué."""
     return len(wrap_dialog_history(dialog_history, max_width_px, font_size))
+
+
+class WrappedHistory:
+    """
+    wrap_dialog_history incrémental, pour le rendu de chaque frame.
+
+    L'historique change surtout par la fin (nouvelle réplique, texte en streaming,
+    annulation, ligne d'attente) : les entrées déjà découpées sont reconnues par
+    identité (comparaison en C, sans découpage) et seules celles qui suivent la
+    première différence sont re-découpées.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self._entries = []
+        self._offsets = []  # index dans lines de la première ligne de chaque entrée
+        self._params = None
+
+    def update(self, dialog_history, max_width_px: float, font_size: int = 18):
+        keep = 0
+        if (max_width_px, font_size) == self._params:
+            same = list(map(operator.is_, dialog_history, self._entries))
+            keep = same.index(False) if False in same else len(same)
+
+        self._params = (max_width_px, font_size)
+        del self.lines[self._offsets[keep] if keep < len(self._offsets) else len(self.lines):]
+        del self._entries[keep:]
+        del self._offsets[keep:]
+
+        for entry in dialog_history[keep:]:
+            speaker, message = entry
+            self._entries.append(entry)
+            self._offsets.append(len(self.lines))
+            self.lines.extend(wrap_text_to_width(f"{speaker}: {message}", max_width_px, font_size))
+            self.lines.append("")
+        return self.lines
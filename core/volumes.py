@@ -0,0 +1,85 @@
+from typing import Iterable, List, Optional
+
+import arcade
+
+
+class Volume:
+    """
+    Volume invisible de la map (mur, transition, zone d'interaction de PNJ) :
+    une simple boîte, sans texture ni sprite. Les propriétés utiles au jeu
+    (target_map, target_spawn, npc_ref) sont portées directement.
+    """
+
+    __slots__ = ("kind", "left", "bottom", "right", "top", "target_map", "target_spawn", "npc_ref")
+
+    def __init__(self, kind: str, center_x: float, center_y: float, width: float, height: float):
+        self.kind = kind
+        self.left = center_x - width / 2.0
+        self.right = center_x + width / 2.0
+        self.bottom = center_y - height / 2.0
+        self.top = center_y + height / 2.0
+        self.target_map: Optional[str] = None
+        self.target_spawn: Optional[str] = None
+        self.npc_ref = None
+
+    @property
+    def center_x(self) -> float:
+        return (self.left + self.right) / 2.0
+
+    @property
+    def center_y(self) -> float:
+        return (self.bottom + self.top) / 2.0
+
+    @property
+    def width(self) -> float:
+        return self.right - self.left
+
+    @property
+    def height(self) -> float:
+        return self.top - self.bottom
+
+    def overlaps(self, left: float, bottom: float, right: float, top: float) -> bool:
+        return self.left < right and left < self.right and self.bottom < top and bottom < self.top
+
+    def overlaps_sprite(self, sprite) -> bool:
+        return self.overlaps(sprite.left, sprite.bottom, sprite.right, sprite.top)
+
+
+class VolumeSet:
+    """
+    Volumes d'un même type. Les requêtes spatiales passent par StaticSpatialHash
+    (murs) ou InteractionBroadphase (zones), qui indexent leurs boîtes.
+
+    Aucune ressource GPU n'est allouée au chargement : le rendu de debug construit
+    sa liste de formes à la première demande seulement.
+    """
+
+    def __init__(self, volumes: Iterable[Volume] = ()):
+        self.volumes: List[Volume] = list(volumes)
+        self._debug_shapes = None
+
+    def __len__(self) -> int:
+        return len(self.volumes)
+
+    def __iter__(self):
+        return iter(self.volumes)
+
+    def __bool__(self) -> bool:
+        return bool(self.volumes)
+
+    # ------------------------------------------------------------------
+    # RENDU DE DEBUG
+    # ------------------------------------------------------------------
+    def draw(self, color, filled: bool = True) -> None:
+        if not self.volumes:
+            return
+        if self._debug_shapes is None:
+            shapes = arcade.shape_list.ShapeElementList()
+            create = (
+                arcade.shape_list.create_rectangle_filled if filled
+                else arcade.shape_list.create_rectangle_outline
+            )
+            for v in self.volumes:
+                shapes.append(create(v.center_x, v.center_y, v.width, v.height, color))
+            self._debug_shapes = shapes
+        self._debug_shapes.draw()
@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from core.game import Game
+from managers.llm_metrics import METRICS
 
 def reset_all_memories():
     base = "npc"
@@ -17,12 +18,19 @@ def reset_all_memories():
         if os.path.isfile(memory_path):
             with open(memory_path, "w", encoding="utf-8") as f:
                 json.dump([], f)
+        for derived in ("memory.jsonl", "summary.json"):
+            derived_path = os.path.join(base, folder, derived)
+            if os.path.isfile(derived_path):
+                os.remove(derived_path)
 
 def main():
     reset_all_memories()
     game = Game()
     game.setup()
     arcade.run()
+    game.dialog_system.shutdown()
+    game.map_manager.shutdown()
+    METRICS.export("metrics")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+# Approximation : ~3,5 caractères par token pour du français
+CHARS_PER_TOKEN = 3.5
+
+# Un seul thread pour tous les résumés : ils ne sont jamais sur le chemin critique
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+
+
+def shutdown_summaries() -> None:
+    """À la fermeture : abandonne les résumés en attente et termine celui en cours."""
+    _SUMMARY_EXECUTOR.shutdown(wait=True, cancel_futures=True)
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+class ConversationMemory:
+    """
+    Fenêtre de contexte bornée pour un PNJ :
+    - les `recent_turns` derniers échanges sont envoyés mot pour mot ;
+    - les plus anciens sont repliés dans un résumé glissant (summary.json),
+      généré en arrière-plan par `summarize(previous_summary, messages)`, par lots
+      de `recent_turns` échanges ;
+    - la requête complète ne dépasse pas `token_budget` tokens estimés.
+
+    L'historique complet reste dans `history` (mémoire du PNJ), seul le prompt est borné.
+    Avec `synchronous`, le résumé est calculé sur place : les requêtes ne dépendent
+    alors que du nombre de tours (enregistrement / relecture de cassettes).
+    """
+
+    def __init__(
+        self,
+        npc_folder: str,
+        history: List[Dict[str, str]],
+        summarize: Callable[[str, List[Dict[str, str]]], str],
+        recent_turns: int,
+        token_budget: int,
+        synchronous: bool = False,
+    ):
+        self.summary_path = os.path.join(npc_folder, "summary.json")
+        self.history = history
+        self.summarize = summarize
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.synchronous = synchronous
+
+        # (nombre de messages couverts, texte) : remplacé d'un bloc par le thread de résumé
+        self._summary: Tuple[int, str] = self._load_summary()
+        self._job = None
+
+    # ------------------------------------------------------------------
+    def _load_summary(self) -> Tuple[int, str]:
+        try:
+            with open(self.summary_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data["covered"]), str(data["text"])
+        except Exception:
+            return 0, ""
+
+    def _save_summary(self, covered: int, text: str) -> None:
+        tmp_path = self.summary_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"covered": covered, "text": text}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.summary_path)
+
+    # ------------------------------------------------------------------
+    def window(self, reserved_tokens: int) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Renvoie (résumé, messages récents) à insérer dans le prompt.
+        reserved_tokens = taille déjà prise par le message system et le message du joueur.
+        """
+        covered, summary = self._summary
+        if covered > len(self.history):
+            # Mémoire remise à zéro depuis le résumé
+            covered, summary = 0, ""
+
+        # Fenêtre verbatim : exactement les `recent_turns` derniers échanges
+        tail_start = max(covered, len(self.history) - 2 * self.recent_turns)
+        recent = self.history[tail_start:]
+        budget = self.token_budget - reserved_tokens - estimate_tokens(summary)
+
+        # On retire les échanges les plus anciens (par paires) jusqu'à tenir le budget,
+        # en gardant toujours le dernier échange
+        sizes = [estimate_tokens(m["content"]) for m in recent]
+        total = sum(sizes)
+        start = 0
+        while total > budget and len(recent) - start > 2:
+            total -= sizes[start] + sizes[start + 1]
+            start += 2
+
+        # Ce qui sort de la fenêtre verbatim est résumé hors du chemin critique, par lots
+        # de `recent_turns` échanges : un appel de résumé pour plusieurs tours, pas un par tour
+        fold_upto = len(self.history) - 2 * self.recent_turns
+        if fold_upto - covered >= 2 * self.recent_turns:
+            self._schedule_summary(covered, summary, fold_upto)
+
+        return summary, recent[start:]
+
+    def _schedule_summary(self, covered: int, summary: str, upto: int) -> None:
+        if self._job is not None and not self._job.done():
+            return
+
+        to_fold = list(self.history[covered:upto])
+        if self.synchronous:
+            # Les erreurs (CassetteMiss...) remontent à la requête de dialogue
+            self._apply_summary(upto, self.summarize(summary, to_fold).strip())
+            return
+        try:
+            self._job = _SUMMARY_EXECUTOR.submit(self._run_summary, summary, to_fold, upto)
+        except RuntimeError:
+            # Jeu en cours de fermeture (shutdown_summaries) : le lot sera résumé au prochain lancement
+            pass
+
+    def _run_summary(self, previous: str, messages: List[Dict[str, str]], upto: int) -> None:
+        try:
+            text = self.summarize(previous, messages).strip()
+        except Exception as exc:
+            print(f"[MEMORY] résumé impossible : {exc!r}")
+            return
+        self._apply_summary(upto, text)
+
+    def _apply_summary(self, upto: int, text: str) -> None:
+        self._summary = (upto, text)
+        try:
+            self._save_summary(upto, text)
+        except OSError as exc:
+            print(f"[MEMORY] sauvegarde du résumé impossible : {exc}")
@@ -0,0 +1,374 @@
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from core.dialog_settings_loader import get_dialog_settings
+
+Messages = List[dict]
+
+
+@dataclass
+class Completion:
+    """Réponse complète d'un backend, indépendante du fournisseur."""
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class CompletionStream:
+    """
+    Flux de morceaux de texte (itérable en sync ou en async selon le backend).
+    prompt_tokens / completion_tokens sont renseignés quand le fournisseur les donne,
+    en général à la fin du flux.
+    """
+
+    def __init__(self):
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self._chunks: Any = None
+
+    def attach(self, chunks) -> "CompletionStream":
+        self._chunks = chunks
+        return self
+
+    def __iter__(self) -> Iterator[str]:
+        return self._chunks
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._chunks
+
+    def close(self) -> None:
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+    async def aclose(self) -> None:
+        aclose = getattr(self._chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class LLMBackend(abc.ABC):
+    """
+    Interface commune des backends LLM : complétion synchrone, asynchrone et streaming.
+    `json_reply` indique que l'appelant attend l'objet {response_text, emotion} ;
+    seuls les backends factices s'en servent.
+    """
+
+    name = "base"
+
+    # Payloads reproductibles à l'identique (cassette) : pas de travail en fond dont
+    # le timing changerait le contenu des requêtes suivantes (ex. résumé glissant)
+    replayable = False
+
+    @abc.abstractmethod
+    def complete(self, messages: Messages, temperature: float = 0.7,
+                 max_tokens: Optional[int] = None, json_reply: bool = True) -> Completion:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stream(self, messages: Messages, temperature: float = 0.7,
+               json_reply: bool = True) -> CompletionStream:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def acomplete(self, messages: Messages, temperature: float = 0.7,
+                        max_tokens: Optional[int] = None, json_reply: bool = True) -> Completion:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def astream(self, messages: Messages, temperature: float = 0.7,
+                json_reply: bool = True) -> CompletionStream:
+        raise NotImplementedError
+
+
+# ----------------------------------------------------------------------
+# GROQ
+# ----------------------------------------------------------------------
+class GroqBackend(LLMBackend):
+    """
+    Backend Groq. Les clients (sync et async) sont créés à la première utilisation
+    et gardent leurs connexions ouvertes (keep-alive) pour toute la durée du processus.
+    """
+
+    name = "groq"
+
+    # Même pool de connexions pour les deux clients
+    HTTP_LIMITS = dict(max_connections=8, max_keepalive_connections=4, keepalive_expiry=300)
+
+    def __init__(self, model: str = "llama-3.3-70b-versatile"):
+        self.model = model
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from groq import Groq, DefaultHttpxClient
+
+                self._client = Groq(
+                    api_key=os.environ["GROQ_KEY"],
+                    http_client=DefaultHttpxClient(limits=httpx.Limits(**self.HTTP_LIMITS)),
+                )
+            return self._client
+
+    @property
+    def async_client(self):
+        with self._lock:
+            if self._async_client is None:
+                import httpx
+                from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+                self._async_client = AsyncGroq(
+                    api_key=os.environ["GROQ_KEY"],
+                    http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(**self.HTTP_LIMITS)),
+                )
+            return self._async_client
+
+    @staticmethod
+    def _completion(response) -> Completion:
+        usage = getattr(response, "usage", None)
+        return Completion(
+            text=response.choices[0].message.content or "",
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+        )
+
+    @staticmethod
+    def _chunk_text(chunk, stream: CompletionStream) -> str:
+        # Groq renvoie l'usage dans le dernier morceau du flux
+        x_groq = getattr(chunk, "x_groq", None)
+        usage = getattr(x_groq, "usage", None) if x_groq is not None else None
+        if usage is not None:
+            stream.prompt_tokens = usage.prompt_tokens
+            stream.completion_tokens = usage.completion_tokens
+        if not chunk.choices:
+            return ""
+        return chunk.choices[0].delta.content or ""
+
+    def complete(self, messages, temperature=0.7, max_tokens=None, json_reply=True):
+        extra = {"max_tokens": max_tokens} if max_tokens else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            **extra,
+        )
+        return self._completion(response)
+
+    def stream(self, messages, temperature=0.7, json_reply=True):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+        )
+        stream = CompletionStream()
+
+        def chunks():
+            try:
+                for chunk in response:
+                    text = self._chunk_text(chunk, stream)
+                    if text:
+                        yield text
+            finally:
+                response.close()
+
+        return stream.attach(chunks())
+
+    async def acomplete(self, messages, temperature=0.7, max_tokens=None, json_reply=True):
+        extra = {"max_tokens": max_tokens} if max_tokens else {}
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            **extra,
+        )
+        return self._completion(response)
+
+    def astream(self, messages, temperature=0.7, json_reply=True):
+        stream = CompletionStream()
+
+        async def chunks():
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+            )
+            try:
+                async for chunk in response:
+                    text = self._chunk_text(chunk, stream)
+                    if text:
+                        yield text
+            finally:
+                # Arrêt anticipé (annulation, Échap) : la connexion retourne au pool
+                await response.close()
+
+        return stream.attach(chunks())
+
+
+# ----------------------------------------------------------------------
+# BACKEND HORS LIGNE (DÉTERMINISTE)
+# ----------------------------------------------------------------------
+_OFFLINE_LINES = [
+    "Ah, te revoilà. Que puis-je faire pour toi ?",
+    "Les temps sont durs à Saint-Rocheval, tu sais.",
+    "Je n'ai pas beaucoup de temps, mais je t'écoute.",
+    "Intéressant... Dis-m'en davantage.",
+    "Hmm. Je ne suis pas certain de te suivre.",
+    "Reviens me voir quand tu auras ce qu'il me faut.",
+]
+_OFFLINE_EMOTIONS = ["neutre", "neutre", "positive", "positive", "negative", "tres_positive", "tres_negative"]
+
+
+class OfflineBackend(LLMBackend):
+    """
+    Remplaçant local, sans réseau : renvoie un JSON {response_text, emotion} valide.
+    La réponse ne dépend que des messages et de `seed`, donc deux exécutions
+    identiques donnent les mêmes dialogues. La latence (premier token), sa gigue et
+    le débit du streaming sont configurables pour simuler un fournisseur.
+    """
+
+    name = "offline"
+
+    def __init__(self, latency_ms: float = 400.0, jitter_ms: float = 150.0,
+                 tokens_per_second: float = 250.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.seed = seed
+
+    # ------------------------------------------------------------------
+    def _rng(self, messages: Messages) -> random.Random:
+        payload = json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(payload).digest()
+        return random.Random(int.from_bytes(digest[:8], "big") ^ self.seed)
+
+    def _reply(self, messages: Messages, json_reply: bool):
+        """Renvoie (texte, délai premier token en s, délai par morceau en s)."""
+        rng = self._rng(messages)
+        last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        line = rng.choice(_OFFLINE_LINES)
+        echo = last_user.strip().splitlines()[0][:60] if last_user.strip() else ""
+        text = f"{line} « {echo} », dis-tu ?" if echo else line
+
+        if json_reply:
+            text = json.dumps(
+                {"response_text": text, "emotion": rng.choice(_OFFLINE_EMOTIONS)},
+                ensure_ascii=False,
+            )
+
+        delay = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+        per_chunk = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return text, delay, per_chunk
+
+    @staticmethod
+    def _usage(messages: Messages, text: str):
+        from managers.conversation_memory import estimate_tokens
+        prompt = sum(estimate_tokens(m["content"]) for m in messages)
+        return prompt, estimate_tokens(text)
+
+    @staticmethod
+    def _split(text: str) -> List[str]:
+        # Morceaux de ~4 caractères, l'ordre de grandeur d'un token
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    # ------------------------------------------------------------------
+    def complete(self, messages, temperature=0.7, max_tokens=None, json_reply=True):
+        text, delay, per_chunk = self._reply(messages, json_reply)
+        time.sleep(delay + per_chunk * len(self._split(text)))
+        prompt_tokens, completion_tokens = self._usage(messages, text)
+        return Completion(text, prompt_tokens, completion_tokens)
+
+    def stream(self, messages, temperature=0.7, json_reply=True):
+        text, delay, per_chunk = self._reply(messages, json_reply)
+        stream = CompletionStream()
+
+        def chunks():
+            time.sleep(delay)
+            for piece in self._split(text):
+                yield piece
+                time.sleep(per_chunk)
+            stream.prompt_tokens, stream.completion_tokens = self._usage(messages, text)
+
+        return stream.attach(chunks())
+
+    async def acomplete(self, messages, temperature=0.7, max_tokens=None, json_reply=True):
+        text, delay, per_chunk = self._reply(messages, json_reply)
+        await asyncio.sleep(delay + per_chunk * len(self._split(text)))
+        prompt_tokens, completion_tokens = self._usage(messages, text)
+        return Completion(text, prompt_tokens, completion_tokens)
+
+    def astream(self, messages, temperature=0.7, json_reply=True):
+        text, delay, per_chunk = self._reply(messages, json_reply)
+        stream = CompletionStream()
+
+        async def chunks():
+            await asyncio.sleep(delay)
+            for piece in self._split(text):
+                yield piece
+                await asyncio.sleep(per_chunk)
+            stream.prompt_tokens, stream.completion_tokens = self._usage(messages, text)
+
+        return stream.attach(chunks())
+
+
+# ----------------------------------------------------------------------
+# SÉLECTION
+# ----------------------------------------------------------------------
+_BACKEND: LLMBackend | None = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def create_backend(name: str) -> LLMBackend:
+    settings = get_dialog_settings()
+
+    if name == "groq":
+        return GroqBackend(model=settings.get("model"))
+    if name == "offline":
+        return OfflineBackend(
+            latency_ms=float(settings.get("offline_latency_ms")),
+            jitter_ms=float(settings.get("offline_jitter_ms")),
+            tokens_per_second=float(settings.get("offline_tokens_per_second")),
+            seed=int(settings.get("offline_seed")),
+        )
+    raise ValueError(f"Backend LLM inconnu : {name!r} (attendu : 'groq' ou 'offline')")
+
+
+def get_backend() -> LLMBackend:
+    """
+    Backend partagé par tous les PNJ. Choisi par la variable d'environnement
+    LLM_BACKEND, sinon par la clé "backend" de config/dialog_settings.json.
+
+    Si LLM_CASSETTE (ou "cassette") désigne un fichier, le backend est enveloppé
+    dans une cassette : LLM_CASSETTE_MODE=record enregistre les échanges réels,
+    replay (par défaut) les rejoue sans réseau.
+    """
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            settings = get_dialog_settings()
+            cassette_path = os.environ.get("LLM_CASSETTE") or settings.get("cassette")
+            mode = (os.environ.get("LLM_CASSETTE_MODE") or settings.get("cassette_mode")).lower()
+
+            if cassette_path and mode == "replay":
+                from managers.llm_cassette import Cassette, CassetteBackend
+                _BACKEND = CassetteBackend(Cassette(cassette_path), mode="replay")
+            else:
+                name = os.environ.get("LLM_BACKEND") or settings.get("backend")
+                _BACKEND = create_backend(name.lower())
+                if cassette_path:
+                    from managers.llm_cassette import Cassette, CassetteBackend
+                    _BACKEND = CassetteBackend(Cassette(cassette_path), mode=mode, inner=_BACKEND)
+        return _BACKEND
@@ -0,0 +1,216 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import Dict, Optional
+
+from managers.llm_backend import Completion, CompletionStream, LLMBackend, Messages
+
+
+class CassetteMiss(KeyError):
+    """Aucun enregistrement pour ce payload en mode replay."""
+
+
+def payload_key(messages: Messages, temperature: float, max_tokens: Optional[int], json_reply: bool) -> str:
+    """
+    Empreinte d'une requête. Les espaces sont normalisés pour qu'un simple
+    reformatage du prompt ne casse pas le replay.
+    """
+    normalized = {
+        "messages": [
+            {"role": m["role"], "content": " ".join(m["content"].split())}
+            for m in messages
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "json_reply": json_reply,
+    }
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """
+    Enregistrements sur disque : JSONL compressé en gzip (un membre gzip par ajout,
+    lisible d'un bloc). Chaque ligne contient la clé, les messages envoyés,
+    la complétion brute et l'usage en tokens.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.isfile(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.entries.get(key)
+
+    def record(self, key: str, messages: Messages, completion: Completion) -> None:
+        entry = {
+            "key": key,
+            "messages": messages,
+            "completion": completion.text,
+            "prompt_tokens": completion.prompt_tokens,
+            "completion_tokens": completion.completion_tokens,
+            "prompt_bytes": sum(len(m["content"].encode("utf-8")) for m in messages),
+        }
+        with self._lock:
+            if key in self.entries:
+                return
+            self.entries[key] = entry
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+class CassetteBackend(LLMBackend):
+    """
+    Backend d'enregistrement / relecture :
+    - mode "record" : délègue à `inner` et enregistre chaque payload + complétion ;
+    - mode "replay" : répond depuis la cassette, sans réseau ni délai
+      (CassetteMiss si le payload n'a jamais été enregistré).
+    """
+
+    name = "cassette"
+    replayable = True
+
+    def __init__(self, cassette: Cassette, mode: str = "replay", inner: LLMBackend | None = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Mode de cassette inconnu : {mode!r} (attendu : 'record' ou 'replay')")
+        if mode == "record" and inner is None:
+            raise ValueError("Le mode 'record' nécessite un backend réel à enregistrer")
+        self.cassette = cassette
+        self.mode = mode
+        self.inner = inner
+
+    # ------------------------------------------------------------------
+    def _replay(self, key: str) -> Completion:
+        entry = self.cassette.get(key)
+        if entry is None:
+            raise CassetteMiss(key)
+        return Completion(entry["completion"], entry["prompt_tokens"], entry["completion_tokens"])
+
+    @staticmethod
+    def _split(text: str):
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    # ------------------------------------------------------------------
+    def complete(self, messages, temperature=0.7, max_tokens=None, json_reply=True):
+        key = payload_key(messages, temperature, max_tokens, json_reply)
+        if self.mode == "replay":
+            return self._replay(key)
+
+        completion = self.inner.complete(messages, temperature, max_tokens, json_reply)
+        self.cassette.record(key, messages, completion)
+        return completion
+
+    def stream(self, messages, temperature=0.7, json_reply=True):
+        key = payload_key(messages, temperature, None, json_reply)
+        stream = CompletionStream()
+
+        if self.mode == "replay":
+            completion = self._replay(key)
+            stream.prompt_tokens = completion.prompt_tokens
+            stream.completion_tokens = completion.completion_tokens
+            return stream.attach(iter(self._split(completion.text)))
+
+        inner = self.inner.stream(messages, temperature, json_reply)
+
+        def chunks():
+            parts = []
+            try:
+                for piece in inner:
+                    parts.append(piece)
+                    yield piece
+            finally:
+                inner.close()
+            stream.prompt_tokens = inner.prompt_tokens
+            stream.completion_tokens = inner.completion_tokens
+            # Seuls les flux lus jusqu'au bout sont enregistrés
+            self.cassette.record(
+                key, messages,
+                Completion("".join(parts), inner.prompt_tokens, inner.completion_tokens),
+            )
+
+        return stream.attach(chunks())
+
+    async def acomplete(self, messages, temperature=0.7, max_tokens=None, json_reply=True):
+        key = payload_key(messages, temperature, max_tokens, json_reply)
+        if self.mode == "replay":
+            return self._replay(key)
+
+        completion = await self.inner.acomplete(messages, temperature, max_tokens, json_reply)
+        self.cassette.record(key, messages, completion)
+        return completion
+
+    def astream(self, messages, temperature=0.7, json_reply=True):
+        key = payload_key(messages, temperature, None, json_reply)
+        stream = CompletionStream()
+
+        async def chunks():
+            if self.mode == "replay":
+                completion = self._replay(key)
+                stream.prompt_tokens = completion.prompt_tokens
+                stream.completion_tokens = completion.completion_tokens
+                for piece in self._split(completion.text):
+                    yield piece
+                return
+
+            inner = self.inner.astream(messages, temperature, json_reply)
+            parts = []
+            try:
+                async for piece in inner:
+                    parts.append(piece)
+                    yield piece
+            finally:
+                await inner.aclose()
+            stream.prompt_tokens = inner.prompt_tokens
+            stream.completion_tokens = inner.completion_tokens
+            self.cassette.record(
+                key, messages,
+                Completion("".join(parts), inner.prompt_tokens, inner.completion_tokens),
+            )
+
+        return stream.attach(chunks())
+
+
+# ----------------------------------------------------------------------
+# STATISTIQUES : python -m managers.llm_cassette <cassette.jsonl.gz>
+# ----------------------------------------------------------------------
+def _print_stats(path: str) -> None:
+    """Taille des prompts enregistrés, par PNJ (nom tiré du message system)."""
+    cassette = Cassette(path)
+    per_npc: Dict[str, list] = {}
+    for entry in cassette.entries.values():
+        first = entry["messages"][0]["content"] if entry["messages"] else ""
+        npc = first.split(",")[0].replace("Tu es ", "")[:40] if first.startswith("Tu es ") else "(autre)"
+        per_npc.setdefault(npc, []).append(entry)
+
+    print(f"{len(cassette.entries)} requêtes dans {path}")
+    for npc, entries in sorted(per_npc.items()):
+        prompt_bytes = [e["prompt_bytes"] for e in entries]
+        prompt_tokens = [e["prompt_tokens"] for e in entries if e["prompt_tokens"] is not None]
+        line = f"  {npc:<40} n={len(entries):<4} octets moy={sum(prompt_bytes) / len(prompt_bytes):8.0f} max={max(prompt_bytes):6d}"
+        if prompt_tokens:
+            line += f"  tokens moy={sum(prompt_tokens) / len(prompt_tokens):7.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage : python -m managers.llm_cassette <cassette.jsonl.gz>")
+        sys.exit(1)
+    _print_stats(sys.argv[1])
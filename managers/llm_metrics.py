@@ -0,0 +1,134 @@
+import csv
+import json
+import math
+import os
+import threading
+from typing import Dict, Tuple
+
+# Bornes supérieures des classes d'histogramme
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2000, 3000, 5000, 10000, 30000, math.inf)
+SIZE_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, math.inf)
+
+
+class Histogram:
+    """Histogramme à classes fixes, avec compte, somme, min et max exacts."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> float:
+        """Approximation : borne supérieure de la classe contenant le p-ième centile."""
+        if self.count == 0:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": {
+                ("inf" if math.isinf(b) else str(b)): n
+                for b, n in zip(self.bounds, self.buckets)
+            },
+        }
+
+
+class LLMMetrics:
+    """
+    Métriques des appels LLM, agrégées par PNJ :
+    - histogrammes : queue_ms, ttft_ms, latency_ms, prompt_tokens, completion_tokens,
+      section_bytes.<section> (taille de chaque partie du prompt)
+    - compteurs : requests, parse_fallback, errors...
+    Thread-safe : alimenté à la fois par le thread principal et les workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, npc: str, metric: str, value: float) -> None:
+        with self._lock:
+            hist = self.histograms.get((npc, metric))
+            if hist is None:
+                bounds = LATENCY_BUCKETS_MS if metric.endswith("_ms") else SIZE_BUCKETS
+                hist = self.histograms[(npc, metric)] = Histogram(bounds)
+            hist.observe(value)
+
+    def increment(self, npc: str, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[(npc, counter)] = self.counters.get((npc, counter), 0) + n
+
+    def is_empty(self) -> bool:
+        return not self.histograms and not self.counters
+
+    # ------------------------------------------------------------------
+    # EXPORT
+    # ------------------------------------------------------------------
+    def to_dict(self) -> dict:
+        with self._lock:
+            data: Dict[str, dict] = {}
+            for (npc, metric), hist in sorted(self.histograms.items()):
+                data.setdefault(npc, {"histograms": {}, "counters": {}})
+                data[npc]["histograms"][metric] = hist.to_dict()
+            for (npc, counter), value in sorted(self.counters.items()):
+                data.setdefault(npc, {"histograms": {}, "counters": {}})
+                data[npc]["counters"][counter] = value
+            return data
+
+    def export_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def export_csv(self, path: str) -> None:
+        """Une ligne par (PNJ, métrique) ; les compteurs n'ont que la colonne count."""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["npc", "metric", "count", "mean", "min", "max", "p50", "p90", "p99"])
+            for npc, entry in self.to_dict().items():
+                for metric, h in entry["histograms"].items():
+                    writer.writerow([
+                        npc, metric, h["count"],
+                        round(h["mean"], 2), round(h["min"], 2), round(h["max"], 2),
+                        round(h["p50"], 2), round(h["p90"], 2), round(h["p99"], 2),
+                    ])
+                for counter, value in entry["counters"].items():
+                    writer.writerow([npc, counter, value, "", "", "", "", "", ""])
+
+    def export(self, folder: str = "metrics") -> None:
+        """Écrit llm_metrics.json et llm_metrics.csv dans `folder`."""
+        if self.is_empty():
+            return
+        os.makedirs(folder, exist_ok=True)
+        self.export_json(os.path.join(folder, "llm_metrics.json"))
+        self.export_csv(os.path.join(folder, "llm_metrics.csv"))
+
+
+# Instance unique pour tout le processus
+METRICS = LLMMetrics()
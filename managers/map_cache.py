@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+# Estimation grossière du coût d'un sprite de tuile (sprite Python + slot GPU).
+# Les textures sont partagées par arcade et ne sont pas comptées.
+SPRITE_BYTES_ESTIMATE = 1024
+VOLUME_BYTES_ESTIMATE = 128  # Volume à __slots__ + sa boîte dans l'index spatial
+
+
+class LoadedMap:
+    """Tout ce que MapManager dérive d'une map Tiled, réutilisable tel quel."""
+
+    FIELDS = (
+        "tile_map", "scene",
+        "walls", "wall_index", "occupancy",
+        "transitions", "npc_list", "npc_interactions", "items",
+    )
+
+    __slots__ = FIELDS + ("size_bytes",)
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields[name])
+        self.size_bytes = self._estimate_bytes()
+
+    def _estimate_bytes(self) -> int:
+        sprites = sum(len(sprite_list) for sprite_list in self.tile_map.sprite_lists.values())
+        sprites += len(self.npc_list) + len(self.items)
+        size = sprites * SPRITE_BYTES_ESTIMATE
+        size += (len(self.walls) + len(self.transitions) + len(self.npc_interactions)) * VOLUME_BYTES_ESTIMATE
+        if self.occupancy is not None:
+            size += self.occupancy.cells.nbytes
+        return size
+
+
+class MapCache:
+    """
+    Cache LRU des maps chargées. Une map est évincée (la plus ancienne d'abord) dès que
+    le nombre de maps dépasse `capacity` ou que leur taille estimée dépasse `max_bytes`.
+    La map la plus récente et les maps épinglées ne sont jamais évincées, même si
+    elles dépassent à elles seules le budget.
+    """
+
+    def __init__(self, capacity: int = 4, max_bytes: int = 256 * 1024 * 1024):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._maps: "OrderedDict[str, LoadedMap]" = OrderedDict()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._maps
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._maps.values())
+
+    def get(self, name: str) -> Optional[LoadedMap]:
+        entry = self._maps.get(name)
+        if entry is not None:
+            self._maps.move_to_end(name)
+        return entry
+
+    def put(self, name: str, entry: LoadedMap, pinned: Iterable[str] = ()) -> None:
+        """Ajoute une map ; les maps de `pinned` (la map courante) ne sont jamais évincées."""
+        self._maps[name] = entry
+        self._maps.move_to_end(name)
+        keep = {name, *pinned}
+        while len(self._maps) > self.capacity or self.size_bytes > self.max_bytes:
+            victim = next((key for key in self._maps if key not in keep), None)
+            if victim is None:
+                break
+            del self._maps[victim]
+
+    def clear(self) -> None:
+        self._maps.clear()
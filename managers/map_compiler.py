@@ -0,0 +1,250 @@
+"""
+Maps Tiled précompilées : le .tmx (XML + couches en base64) et ses tilesets .tsx
+sont lus une seule fois par pytiled-parser, puis sauvegardés sous forme binaire.
+
+Format d'un fichier compilé (<cache>/<map>.mapc) :
+    MAGIC | taille de l'en-tête (u64) | en-tête pickle | table des buffers | buffers alignés
+
+L'en-tête contient la version de pytiled-parser et le protocole pickle, le chemin
+absolu du .tmx compilé, les sources (chemin, mtime, taille, sha256) et le TiledMap
+complet (tilesets résolus, couches d'objets déjà extraites). Les images des tilesets
+y sont en chemins absolus : un cache copié avec l'arborescence (ou lu depuis un autre
+dossier) est donc refusé. Les index de tuiles de chaque couche sont sortis hors du
+pickle en tableaux uint32 bruts, lus via mmap.
+
+    python -m managers.map_compiler            # compile toutes les maps de data/maps
+    python -m managers.map_compiler village    # une seule
+"""
+import hashlib
+import importlib.metadata
+import mmap
+import os
+import pickle
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pytiled_parser
+
+COMPILED_DIR = os.path.join("data", "maps", ".compiled")
+MAGIC = b"RPGMAPC1"
+FORMAT_VERSION = 2
+BUFFER_ALIGN = 64
+PICKLE_PROTOCOL = 5
+
+# Le TiledMap est picklé tel quel : ses classes changent avec pytiled-parser.
+# Une autre version (ou un autre protocole pickle) invalide donc le cache.
+PICKLE_KEY = (importlib.metadata.version("pytiled-parser"), PICKLE_PROTOCOL)
+
+# Sources d'une map : (chemin, mtime_ns, taille, sha256)
+Source = Tuple[str, int, int, str]
+
+_TILESET_SOURCE = re.compile(rb'<tileset[^>]*\ssource="([^"]+)"')
+
+
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _describe(path: str) -> Source:
+    st = os.stat(path)
+    return path, st.st_mtime_ns, st.st_size, _sha256(path)
+
+
+def _dependencies(tmx_path: str) -> List[str]:
+    """Le .tmx et les .tsx externes qu'il référence."""
+    with open(tmx_path, "rb") as f:
+        text = f.read()
+    folder = os.path.dirname(tmx_path)
+    paths = [tmx_path]
+    for match in _TILESET_SOURCE.finditer(text):
+        path = os.path.normpath(os.path.join(folder, match.group(1).decode("utf-8")))
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+def compiled_path(tmx_path: str, cache_dir: str = COMPILED_DIR) -> str:
+    name = os.path.splitext(os.path.basename(tmx_path))[0]
+    return os.path.join(cache_dir, f"{name}.mapc")
+
+
+# ----------------------------------------------------------------------
+#                       COUCHES DE TUILES <-> TABLEAUX
+# ----------------------------------------------------------------------
+def _tile_layers(layers):
+    for layer in layers:
+        if isinstance(layer, pytiled_parser.TileLayer):
+            yield layer
+        elif isinstance(layer, pytiled_parser.LayerGroup):
+            yield from _tile_layers(layer.layers or [])
+
+
+def _pack_layers(tiled_map: pytiled_parser.TiledMap) -> None:
+    for layer in _tile_layers(tiled_map.layers):
+        if layer.data is not None:
+            layer.data = np.asarray(layer.data, dtype=np.uint32)
+        for chunk in layer.chunks or []:
+            chunk.data = np.asarray(chunk.data, dtype=np.uint32)
+
+
+def _unpack_layers(tiled_map: pytiled_parser.TiledMap) -> None:
+    """arcade lit des listes Python : conversion en bloc depuis les tableaux mappés."""
+    for layer in _tile_layers(tiled_map.layers):
+        if isinstance(layer.data, np.ndarray):
+            layer.data = layer.data.tolist()
+        for chunk in layer.chunks or []:
+            if isinstance(chunk.data, np.ndarray):
+                chunk.data = chunk.data.tolist()
+
+
+# ----------------------------------------------------------------------
+#                               ÉCRITURE
+# ----------------------------------------------------------------------
+def compile_map(tmx_path: str, cache_dir: str = COMPILED_DIR,
+                tiled_map: Optional[pytiled_parser.TiledMap] = None) -> str:
+    """Compile un .tmx (ou un TiledMap déjà lu depuis ce .tmx) ; retourne le fichier écrit."""
+    sources = [_describe(path) for path in _dependencies(tmx_path)]
+    if tiled_map is None:
+        tiled_map = pytiled_parser.parse_map(Path(tmx_path))
+
+    _pack_layers(tiled_map)
+    try:
+        buffers: List[pickle.PickleBuffer] = []
+        header = pickle.dumps(
+            {"version": FORMAT_VERSION, "pickle": PICKLE_KEY,
+             "origin": os.path.abspath(tmx_path), "sources": sources, "map": tiled_map},
+            protocol=PICKLE_PROTOCOL,
+            buffer_callback=buffers.append,
+        )
+    finally:
+        _unpack_layers(tiled_map)
+
+    raws = [buffer.raw() for buffer in buffers]
+    table_size = 8 + 16 * len(raws)
+    offset = _align(len(MAGIC) + 8 + len(header) + table_size)
+    table = [struct.pack("<Q", len(raws))]
+    for raw in raws:
+        table.append(struct.pack("<QQ", offset, raw.nbytes))
+        offset = _align(offset + raw.nbytes)
+
+    out_path = compiled_path(tmx_path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"".join(table))
+        for raw in raws:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(raw)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _align(offset: int) -> int:
+    return (offset + BUFFER_ALIGN - 1) // BUFFER_ALIGN * BUFFER_ALIGN
+
+
+# ----------------------------------------------------------------------
+#                               LECTURE
+# ----------------------------------------------------------------------
+def _is_fresh(source: Source) -> bool:
+    """Même mtime et taille : à jour. Sinon, seul le contenu fait foi (checkout, copie...)."""
+    path, mtime_ns, size, digest = source
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if st.st_mtime_ns == mtime_ns and st.st_size == size:
+        return True
+    return st.st_size == size and _sha256(path) == digest
+
+
+def load_compiled(tmx_path: str, cache_dir: str = COMPILED_DIR) -> Optional[pytiled_parser.TiledMap]:
+    """TiledMap depuis la version compilée, ou None si absente, illisible ou périmée."""
+    path = compiled_path(tmx_path, cache_dir)
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        view = memoryview(data)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            return None
+        pos = len(MAGIC)
+        (header_size,) = struct.unpack_from("<Q", data, pos)
+        pos += 8
+        header_view = view[pos:pos + header_size]
+        pos += header_size
+        (count,) = struct.unpack_from("<Q", data, pos)
+        pos += 8
+        buffers = []
+        for _ in range(count):
+            offset, size = struct.unpack_from("<QQ", data, pos)
+            pos += 16
+            buffers.append(view[offset:offset + size])
+
+        header = pickle.loads(header_view, buffers=buffers)
+        if header.get("version") != FORMAT_VERSION or header.get("pickle") != PICKLE_KEY:
+            return None
+        if header["origin"] != os.path.abspath(tmx_path):
+            return None
+        if not all(_is_fresh(source) for source in header["sources"]):
+            return None
+
+        tiled_map = header["map"]
+        _unpack_layers(tiled_map)
+        return tiled_map
+    except Exception:
+        return None
+
+
+def load_tiled_map(tmx_path: str, cache_dir: Optional[str] = COMPILED_DIR) -> pytiled_parser.TiledMap:
+    """
+    TiledMap d'un .tmx : version compilée si elle est à jour, sinon lecture du .tmx
+    (et recompilation, pour que le prochain chargement soit rapide).
+    """
+    if cache_dir is None:
+        return pytiled_parser.parse_map(Path(tmx_path))
+
+    tiled_map = load_compiled(tmx_path, cache_dir)
+    if tiled_map is not None:
+        return tiled_map
+
+    tiled_map = pytiled_parser.parse_map(Path(tmx_path))
+    try:
+        compile_map(tmx_path, cache_dir, tiled_map)
+    except Exception as exc:
+        print(f"[MAP] compilation de {tmx_path} impossible : {exc!r}")
+    return tiled_map
+
+
+# ----------------------------------------------------------------------
+def main(argv: List[str]) -> int:
+    maps_folder = os.path.join("data", "maps")
+    names = argv or sorted(
+        os.path.splitext(name)[0] for name in os.listdir(maps_folder) if name.endswith(".tmx")
+    )
+    failed = 0
+    for name in names:
+        tmx_path = os.path.join(maps_folder, f"{name}.tmx")
+        try:
+            out_path = compile_map(tmx_path)
+        except Exception as exc:
+            print(f"  {name:<20} ÉCHEC : {exc!r}")
+            failed += 1
+            continue
+        print(f"  {name:<20} -> {out_path} ({os.path.getsize(out_path) // 1024} Ko)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,9 +1,26 @@
 import os
-from typing import Tuple, Optional
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, FrozenSet, Optional, Set, Tuple
+from core.interaction_broadphase import InteractionBroadphase
 from core.npc import NPC, get_npc_state
+from core.occupancy_grid import OccupancyGrid
+from core.spatial_hash import StaticSpatialHash
+from core.volumes import Volume, VolumeSet
+from managers.map_cache import LoadedMap, MapCache
+from managers.map_compiler import COMPILED_DIR, load_tiled_map
+from managers.texture_manager import TEXTURES
 import arcade
 
 TILE_SCALING = 1.0
+WALL_CELL_SIZE = 64  # taille (px) des cellules de l'index de collisions
+OCCUPANCY_SUBDIVISIONS = 2  # cellules de la grille d'occupation par tuile (par axe)
+MAP_CACHE_CAPACITY = 4  # maps gardées en mémoire pour des transitions instantanées
+MAP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+MAP_UPLOAD_BUDGET_MS = 4.0  # temps GPU accordé par frame aux maps préparées en fond
+DEFAULT_NPC_SCALE = 0.10  # si la propriété Tiled "scale" est absente
+DEFAULT_ITEM_SCALE = 0.8
 
 
 def _extract_point(shape) -> Tuple[float, float]:
@@ -45,20 +62,50 @@ def _extract_bbox(shape) -> Tuple[float, float, float, float]:
 class MapManager:
     """Gère le chargement des maps Tiled : collisions, PNJ, transitions."""
 
-    def __init__(self, window: arcade.Window, maps_folder: str = "data/maps"):
+    def __init__(self, window: arcade.Window, maps_folder: str = "data/maps",
+                 cache_capacity: int = MAP_CACHE_CAPACITY, cache_max_bytes: int = MAP_CACHE_MAX_BYTES,
+                 compiled_dir: Optional[str] = COMPILED_DIR):
         self.window = window
         self.maps_folder = maps_folder
 
+        # Maps précompilées (managers/map_compiler.py) ; None = toujours lire le .tmx
+        self.compiled_dir = compiled_dir
+
         self.current_map: Optional[str] = None
         self.tile_map: Optional[arcade.TileMap] = None
         self.scene: Optional[arcade.Scene] = None
 
-        self.walls = arcade.SpriteList()
-        self.transitions = arcade.SpriteList()
+        # Murs, transitions et zones de PNJ : volumes géométriques, sans sprite
+        self.walls = VolumeSet()
+        self.wall_index = StaticSpatialHash(WALL_CELL_SIZE)
+        self.occupancy: Optional[OccupancyGrid] = None
+        self.transitions = VolumeSet()
         self.npc_list = arcade.SpriteList()
-        self.npc_interactions = arcade.SpriteList()
+        self.npc_interactions = VolumeSet()
+        self.items = arcade.SpriteList()
+
+        # PNJ, objets et transitions : une seule requête de proximité par frame
+        self.interactions = InteractionBroadphase(WALL_CELL_SIZE)
+
+        # Maps déjà construites, et objets ramassés par map (survit à l'éviction)
+        self.cache = MapCache(cache_capacity, cache_max_bytes)
+        self.picked_items: Dict[str, Set[Tuple[str, int, int]]] = {}
+
+        # Chargement en fond : lecture Tiled + sprites sur un thread de travail,
+        # puis envoi au GPU par tranches sur le thread principal (update_loading)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="map")
+        self._loading: Dict[str, Future] = {}
+        self._uploading: "OrderedDict[str, Tuple[LoadedMap, Deque]]" = OrderedDict()
+        self._priority: Optional[str] = None  # map visée par une transition en cours
 
     # ------------------------------------------------------------------
+    @staticmethod
+    def _map_key(map_name: str) -> str:
+        """Les transitions Tiled donnent "village.tmx", le code "village" : une seule clé."""
+        if map_name.lower().endswith(".tmx"):
+            return map_name[:-4]
+        return map_name
+
     def _tmx_path(self, map_name: str) -> str:
         """Retourne le chemin vers la map."""
         if not map_name.lower().endswith(".tmx"):
@@ -66,49 +113,224 @@ class MapManager:
         return os.path.join(self.maps_folder, map_name)
 
     # ------------------------------------------------------------------
-    def load_map(self, map_name: str, spawn_name: str, player_sprite: arcade.Sprite):
-        """Charge une map et configure ses éléments."""
+    def load_map(self, map_name: str, spawn_name: str, player_sprite):
+        """Charge une map (ou la reprend du cache / du chargement en fond) et y place le joueur."""
+        map_name = self._map_key(map_name)
         self.current_map = map_name
+        self._priority = None
+
+        entry = self.cache.get(map_name)
+        if entry is None:
+            entry = self._finish_loading(map_name)
+        for field in LoadedMap.FIELDS:
+            setattr(self, field, getattr(entry, field))
+
+        # --------------------------- JOUEUR ------------------------------
+        spawn_layer = self.tile_map.object_lists.get("Spawn", [])
+        spawn_obj = None
+
+        for obj in spawn_layer:
+            if obj.name == spawn_name:
+                spawn_obj = obj
+                break
+
+        # Si aucun spawn spécifique, on prend le premier
+        if spawn_obj is None and spawn_layer:
+            spawn_obj = spawn_layer[0]
+
+        # Position du joueur
+        if spawn_obj:
+            px, py = _extract_point(spawn_obj.shape)
+            player_sprite.teleport(px, py)
+
+        # -------- Joueur dans la scène --------
+        # Si la SpriteList Player n’existe pas encore, on la crée
+        if "Player" not in self.scene:
+            self.scene.add_sprite_list("Player", sprite_list=TEXTURES.sprite_list())
+
+        # On retire le joueur de la scène précédente (toujours en cache)
+        # et on vide la liste Player pour éviter les doublons
+        player_sprite.remove_from_sprite_lists()
+        player_layer = self.scene["Player"]
+        player_layer.clear()
+
+        # On ajoute le joueur
+        player_layer.append(player_sprite)
+
+        # --------------------------- INTERACTIONS ---------------------------
+        self.interactions.rebuild(self.npc_interactions, self.items, self.transitions)
+
+        # Les maps voisines sont préparées pendant que le joueur explore celle-ci
+        self.preload_adjacent()
+
+    # ------------------------------------------------------------------
+    def take_item(self, item: arcade.Sprite) -> None:
+        """Retire un objet ramassé de la map, y compris pour les prochaines visites."""
+        item.remove_from_sprite_lists()
+        self.interactions.remove(item)
+        self.picked_items.setdefault(self.current_map, set()).add(item.item_key)
+
+    # ------------------------------------------------------------------
+    #                     CHARGEMENT EN ARRIÈRE-PLAN
+    # ------------------------------------------------------------------
+    def preload(self, map_name: str) -> None:
+        """Lance la préparation d'une map sur le thread de travail (sans effet si déjà prête)."""
+        map_name = self._map_key(map_name)
+        if map_name in self.cache or map_name in self._loading or map_name in self._uploading:
+            return
+        picked = frozenset(self.picked_items.get(map_name, ()))
+        self._loading[map_name] = self.executor.submit(self._prepare_map, map_name, picked)
+
+    def prioritize(self, map_name: str) -> None:
+        """
+        Prépare en priorité la map visée par une transition : les voisines encore en file
+        sont annulées (preload_adjacent les relancera) et la cible passe devant les envois GPU.
+        """
+        map_name = self._map_key(map_name)
+        self._priority = map_name
+        for name, future in list(self._loading.items()):
+            if name != map_name and future.cancel():
+                del self._loading[name]
+        if map_name in self._uploading:
+            self._uploading.move_to_end(map_name, last=False)
+        self.preload(map_name)
+
+    def preload_adjacent(self) -> None:
+        """
+        Prépare les maps voisines, au plus capacity - 1 : au-delà, chaque préchargement
+        évincerait une voisine tout juste préparée (la map courante reste épinglée).
+        """
+        targets = dict.fromkeys(
+            self._map_key(volume.target_map) for volume in self.transitions if volume.target_map
+        )
+        targets.pop(self.current_map, None)
+        for map_name in list(targets)[:self.cache.capacity - 1]:
+            self.preload(map_name)
+
+    def load_pending(self, map_name: str) -> bool:
+        """True tant qu'une préparation en fond de cette map n'est pas terminée."""
+        map_name = self._map_key(map_name)
+        return map_name in self._loading or map_name in self._uploading
+
+    def update_loading(self, budget_ms: float = MAP_UPLOAD_BUDGET_MS) -> None:
+        """
+        À appeler à chaque frame : récupère les maps préparées par le thread de travail
+        et crée leurs ressources GPU par petites étapes (une texture ou une SpriteList
+        à la fois), dans la limite du budget.
+        """
+        for map_name, future in list(self._loading.items()):
+            if not future.done():
+                continue
+            del self._loading[map_name]
+            try:
+                entry, work = future.result()
+            except Exception as exc:
+                # Le chargement synchrone de load_map() refera l'erreur au besoin
+                print(f"[MAP] préchargement de {map_name} impossible : {exc!r}")
+                continue
+            self._uploading[map_name] = (entry, deque(work))
+            if map_name == self._priority:
+                self._uploading.move_to_end(map_name, last=False)
+
+        # La première écriture GPU d'une frame peut attendre la fin du rendu précédent :
+        # le budget ne compte qu'à partir de la deuxième étape, sinon une seule passerait
+        deadline = None
+        while self._uploading and (deadline is None or time.perf_counter() < deadline):
+            map_name, (entry, pending) = next(iter(self._uploading.items()))
+            if pending:
+                self._upload_step(pending.popleft())
+                if deadline is None:
+                    deadline = time.perf_counter() + budget_ms / 1000.0
+            if not pending:
+                del self._uploading[map_name]
+                self.cache.put(map_name, entry, pinned=(self.current_map,))
+
+    def _finish_loading(self, map_name: str) -> LoadedMap:
+        """Termine immédiatement la préparation d'une map, en fond ou non (chargement bloquant)."""
+        entry = None
+        future = self._loading.pop(map_name, None)
+        if future is not None:
+            try:
+                entry, work = future.result()
+            except Exception:
+                entry = None
+
+        uploading = self._uploading.pop(map_name, None)
+        if uploading is not None:
+            entry, work = uploading
+
+        if entry is None:
+            entry, work = self._prepare_map(map_name, frozenset(self.picked_items.get(map_name, ())))
+
+        for step in work:
+            self._upload_step(step)
+        self.cache.put(map_name, entry, pinned=(self.current_map,))
+        return entry
+
+    def _prepare_map(self, map_name: str, picked: FrozenSet[Tuple[str, int, int]]):
+        """Thread de travail : map construite + liste des étapes GPU à faire ensuite."""
+        entry = self._build_map(map_name, picked)
+        return entry, _gpu_work(entry, self.window.ctx.default_atlas)
+
+    def _upload_step(self, step) -> None:
+        if isinstance(step, arcade.SpriteList):
+            step.initialize()
+        else:
+            atlas, texture = step
+            atlas.add(texture)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    def _build_map(self, map_name: str, picked: FrozenSet[Tuple[str, int, int]] = frozenset()) -> LoadedMap:
+        """
+        Lit le fichier Tiled et construit collisions, PNJ, transitions et objets.
 
+        Peut tourner sur le thread de travail : rien n'est écrit dans le MapManager et
+        toutes les SpriteList sont paresseuses (aucun appel OpenGL avant initialize()).
+        """
         map_file = self._tmx_path(map_name)
-        self.tile_map = arcade.load_tilemap(map_file, scaling=TILE_SCALING)
-        self.scene = arcade.Scene.from_tilemap(self.tile_map)
+        tiled_map = load_tiled_map(map_file, self.compiled_dir)
+        tile_map = arcade.TileMap(tiled_map=tiled_map, scaling=TILE_SCALING, lazy=True)
+        scene = arcade.Scene.from_tilemap(tile_map)
 
 
         # --------------------------- COLLISIONS ---------------------------
-        self.walls = arcade.SpriteList()
+        walls = VolumeSet(
+            Volume("wall", *_extract_bbox(obj.shape))
+            for obj in tile_map.object_lists.get("Collision", [])
+        )
 
-        if "Collision" in self.tile_map.object_lists:
-            for obj in self.tile_map.object_lists["Collision"]:
-                cx, cy, w, h = _extract_bbox(obj.shape)
-                wall = arcade.SpriteSolidColor(int(w), int(h), (255, 255, 255, 0))
-                wall.center_x = cx
-                wall.center_y = cy
-                self.walls.append(wall)
+        # Index statique : seules les cellules autour du joueur sont testées
+        wall_index = StaticSpatialHash.from_objects(walls, WALL_CELL_SIZE)
 
+        # Grille d'occupation des mêmes murs : pré-test en O(1) avant le balayage exact
+        occupancy = OccupancyGrid(
+            tile_map.width * tile_map.tile_width,
+            tile_map.height * tile_map.tile_height,
+            tile_map.tile_width / OCCUPANCY_SUBDIVISIONS,
+        )
+        for wall in walls:
+            occupancy.fill_box(wall.left, wall.bottom, wall.right, wall.top)
 
-        # --------------------------- TRANSITIONS -------------------------
-        self.transitions = arcade.SpriteList()
-
-        if "Transitions" in self.tile_map.object_lists:
-            for obj in self.tile_map.object_lists["Transitions"]:
-                cx, cy, w, h = _extract_bbox(obj.shape)
-                sprite = arcade.SpriteSolidColor(int(w), int(h), (0, 255, 0, 80))
-                sprite.center_x = cx
-                sprite.center_y = cy
 
-                sprite.target_map = obj.properties.get("target_map")
-                sprite.target_spawn = obj.properties.get("target_spawn")
+        # --------------------------- TRANSITIONS -------------------------
+        transitions = []
 
-                self.transitions.append(sprite)
+        for obj in tile_map.object_lists.get("Transitions", []):
+            volume = Volume("transition", *_extract_bbox(obj.shape))
+            volume.target_map = obj.properties.get("target_map")
+            volume.target_spawn = obj.properties.get("target_spawn")
+            transitions.append(volume)
 
 
         # --------------------------- PNJ + interaction ---------------------------
-        self.npc_list = arcade.SpriteList()
-        self.npc_interactions = arcade.SpriteList()
+        npc_list = TEXTURES.sprite_list(lazy=True)
+        zones = []
 
-        if "NPCs" in self.tile_map.object_lists:
-            for npc in self.tile_map.object_lists["NPCs"]:
+        if "NPCs" in tile_map.object_lists:
+            for npc in tile_map.object_lists["NPCs"]:
                 name = npc.name or ""
 
                 if "maire" in name:
@@ -133,11 +355,9 @@ class MapManager:
                     continue
 
                 # Récupération éventuelle du scale personnalisé
-                custom_scale = npc.properties.get("scale", 0.10)
+                custom_scale = npc.properties.get("scale", DEFAULT_NPC_SCALE)
 
-                sprite = arcade.Sprite(texture_path, scale=custom_scale)
-                sprite.npc_name = name
-                sprite = arcade.Sprite(texture_path, scale=custom_scale)
+                sprite = TEXTURES.sprite(texture_path, custom_scale)
                 sprite.npc_name = name
 
                 # ÉTAT LOGIQUE PERSISTANT DU PNJ (relation, etc.)
@@ -147,81 +367,79 @@ class MapManager:
                 sprite.center_x = x
                 sprite.center_y = y
 
-                x, y = _extract_point(npc.shape)
-                sprite.center_x = x
-                sprite.center_y = y
-
-                self.npc_list.append(sprite)
+                npc_list.append(sprite)
 
                 # Zone d'interaction
                 interaction_size = custom_scale * 400  # ajuste selon ta préférence
-                zone = arcade.SpriteSolidColor(int(interaction_size), int(interaction_size), (0, 0, 0, 0))
-                zone.center_x = x
-                zone.center_y = y
+                zone = Volume("npc", x, y, int(interaction_size), int(interaction_size))
                 zone.npc_ref = sprite
-                self.npc_interactions.append(zone)
+                zones.append(zone)
 
         # Ajout PNJ
-        if "NPCs" not in self.scene:
-            self.scene.add_sprite_list("NPCs")
+        if "NPCs" not in scene:
+            scene.add_sprite_list("NPCs", sprite_list=TEXTURES.sprite_list(lazy=True))
 
-        npc_layer = self.scene["NPCs"]
+        npc_layer = scene["NPCs"]
         npc_layer.clear()
-        for n in self.npc_list:
+        for n in npc_list:
             npc_layer.append(n)
 
 
-        # --------------------------- JOUEUR ------------------------------
-        spawn_layer = self.tile_map.object_lists.get("Spawn", [])
-        spawn_obj = None
-
-        for obj in spawn_layer:
-            if obj.name == spawn_name:
-                spawn_obj = obj
-                break
-
-        # Si aucun spawn spécifique, on prend le premier
-        if spawn_obj is None and spawn_layer:
-            spawn_obj = spawn_layer[0]
-
-        # Position du joueur
-        if spawn_obj:
-            px, py = _extract_point(spawn_obj.shape)
-            player_sprite.center_x = px
-            player_sprite.center_y = py
-
-        # -------- Joueur dans la scène --------
-        # Si la SpriteList Player n’existe pas encore, on la crée
-        if "Player" not in self.scene:
-            self.scene.add_sprite_list("Player")
-
-        # On vide la liste Player pour éviter les doublons quand on change de map
-        player_layer = self.scene["Player"]
-        player_layer.clear()
-
-        # On ajoute le joueur
-        player_layer.append(player_sprite)
-
         # --------------------------- OBJETS RAMASSABLES ---------------------------
-        self.items = arcade.SpriteList()
+        items = TEXTURES.sprite_list(lazy=True)
 
-        if "Items" in self.tile_map.object_lists:
-            for obj in self.tile_map.object_lists["Items"]:
+        if "Items" in tile_map.object_lists:
+            for obj in tile_map.object_lists["Items"]:
                 item_name = obj.name or "unknown"
+                x, y = _extract_point(obj.shape)
+
+                # Déjà ramassé lors d'une visite précédente
+                item_key = (item_name, round(x), round(y))
+                if item_key in picked:
+                    continue
 
                 # Texture depuis propriété Tiled
                 texture_path = obj.properties.get("texture", f"assets/objet/{item_name}.png")
 
                 # Option de scale (depuis Tiled)
-                item_scale = obj.properties.get("scale", 0.8)
+                item_scale = obj.properties.get("scale", DEFAULT_ITEM_SCALE)
 
-                sprite = arcade.Sprite(texture_path, scale=item_scale)
+                sprite = TEXTURES.sprite(texture_path, item_scale)
 
-                x, y = _extract_point(obj.shape)
                 sprite.center_x = x
                 sprite.center_y = y
 
                 sprite.item_id = item_name  # identifiant de l'objet
-                self.items.append(sprite)
-
-
+                sprite.item_key = item_key  # nom + position d'origine dans la map
+                items.append(sprite)
+
+        return LoadedMap(
+            tile_map=tile_map,
+            scene=scene,
+            walls=walls,
+            wall_index=wall_index,
+            occupancy=occupancy,
+            transitions=VolumeSet(transitions),
+            npc_list=npc_list,
+            npc_interactions=VolumeSet(zones),
+            items=items,
+        )
+
+
+def _gpu_work(entry: LoadedMap, default_atlas) -> list:
+    """
+    Ressources GPU d'une map encore à créer : chaque (atlas, texture) (ajout à l'atlas,
+    l'étape la plus coûteuse ; immédiat pour les sprites déjà dans l'atlas partagé)
+    puis chaque SpriteList, qui n'a alors plus que ses buffers à créer.
+    """
+    lists = {}
+    for sprite_list in (*entry.tile_map.sprite_lists.values(), entry.scene["NPCs"], entry.items, entry.npc_list):
+        lists.setdefault(id(sprite_list), sprite_list)
+
+    textures = {}
+    for sprite_list in lists.values():
+        atlas = sprite_list.atlas or default_atlas
+        for sprite in sprite_list:
+            textures.setdefault((id(atlas), id(sprite.texture)), (atlas, sprite.texture))
+
+    return [*textures.values(), *lists.values()]
@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Nombre maximum d'enregistrements regroupés sous un même fsync
+FSYNC_BATCH = 32
+# Délai maximum pendant lequel on attend d'autres enregistrements avant le fsync
+FSYNC_INTERVAL = 0.25
+# Au-delà de ce nombre d'entrées dans le journal, on le replie dans memory.json
+COMPACT_EVERY = 64
+
+
+class MemoryStore:
+    """
+    Mémoire persistante d'un PNJ, en deux fichiers :
+    - memory.json  : snapshot (liste de messages, même format qu'avant)
+    - memory.jsonl : journal, un enregistrement par message ajouté depuis le snapshot
+
+    append() ne fait que mettre l'enregistrement en file : l'écriture, le fsync et la
+    compaction ont lieu sur un thread d'écriture partagé par tous les PNJ.
+    Chaque enregistrement porte son numéro de séquence, donc un crash entre la
+    réécriture du snapshot et la remise à zéro du journal ne duplique rien.
+    """
+
+    def __init__(self, npc_folder: str, compact_every: int = COMPACT_EVERY):
+        self.snapshot_path = os.path.join(npc_folder, "memory.json")
+        self.journal_path = os.path.join(npc_folder, "memory.jsonl")
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._mtimes: Tuple[int, int] = (0, 0)
+
+        # Côté thread d'écriture uniquement
+        self._records: List[Dict[str, str]] = []
+        self._journal_len = 0
+        self._journal_file = None
+
+    # ------------------------------------------------------------------
+    # CHARGEMENT
+    # ------------------------------------------------------------------
+    def load(self) -> List[Dict[str, str]]:
+        """Reconstruit l'historique : snapshot + fin du journal."""
+        if not os.path.exists(self.snapshot_path):
+            self._write_snapshot([])
+
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except Exception:
+            history = []
+            self._write_snapshot([])
+
+        journal_len = 0
+        torn = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée (arrêt brutal) : on s'arrête là
+                        torn = True
+                        break
+                    journal_len += 1
+                    if record.get("seq", 0) < len(history):
+                        continue
+                    history.append({"role": record["role"], "content": record["content"]})
+
+        self._records = list(history)
+        self._journal_len = journal_len
+
+        # Journal abîmé : on repart d'un snapshot propre pour ne pas écrire à la suite
+        if torn:
+            self._compact()
+
+        self._mtimes = self._read_mtimes()
+        return history
+
+    # ------------------------------------------------------------------
+    # AJOUT (thread principal, coût constant)
+    # ------------------------------------------------------------------
+    def append(self, role: str, content: str, seq: int) -> None:
+        with self._lock:
+            self._pending += 1
+        _get_writer().queue.put((self, {"seq": seq, "role": role, "content": content}))
+
+    def is_stale(self) -> bool:
+        """True si les fichiers ont été modifiés par quelqu'un d'autre que ce store."""
+        with self._lock:
+            if self._pending:
+                return False
+            return self._read_mtimes() != self._mtimes
+
+    # ------------------------------------------------------------------
+    # THREAD D'ÉCRITURE
+    # ------------------------------------------------------------------
+    def _write(self, record: Dict) -> None:
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._records.append({"role": record["role"], "content": record["content"]})
+        self._journal_len += 1
+
+    def _sync(self, written: int) -> None:
+        try:
+            if self._journal_file is not None:
+                self._journal_file.flush()
+                os.fsync(self._journal_file.fileno())
+
+            if self._journal_len >= self.compact_every:
+                self._compact()
+        finally:
+            with self._lock:
+                self._pending -= written
+                self._mtimes = self._read_mtimes()
+
+    def _compact(self) -> None:
+        """Replie le journal dans le snapshot, puis vide le journal."""
+        self._write_snapshot(self._records)
+
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+        self._journal_len = 0
+
+    def _write_snapshot(self, history: List[Dict[str, str]]) -> None:
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _read_mtimes(self) -> Tuple[int, int]:
+        def mtime(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except OSError:
+                return 0
+        return mtime(self.snapshot_path), mtime(self.journal_path)
+
+
+class _JournalWriter(threading.Thread):
+    """Thread unique qui écrit les journaux de tous les PNJ, fsync par lots."""
+
+    def __init__(self):
+        super().__init__(name="memory-journal", daemon=True)
+        self.queue: "queue.Queue[Tuple[MemoryStore, Dict]]" = queue.Queue()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + FSYNC_INTERVAL
+
+            # Regroupe ce qui arrive pendant la fenêtre, pour un seul fsync par fichier
+            while len(batch) < FSYNC_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            written: Dict[MemoryStore, int] = {}
+            for store, record in batch:
+                try:
+                    store._write(record)
+                except OSError as exc:
+                    print(f"[MEMORY] écriture impossible dans {store.journal_path} : {exc}")
+                written[store] = written.get(store, 0) + 1
+
+            for store, count in written.items():
+                try:
+                    store._sync(count)
+                except OSError as exc:
+                    print(f"[MEMORY] synchronisation impossible de {store.journal_path} : {exc}")
+
+            for _ in batch:
+                self.queue.task_done()
+
+
+_WRITER: _JournalWriter | None = None
+_WRITER_LOCK = threading.Lock()
+
+
+def _get_writer() -> _JournalWriter:
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = _JournalWriter()
+            _WRITER.start()
+        return _WRITER
+
+
+def flush_all() -> None:
+    """Bloque jusqu'à ce que tous les enregistrements en attente soient sur disque."""
+    if _WRITER is not None:
+        _WRITER.queue.join()
+
+
+atexit.register(flush_all)
@@ -1,6 +1,14 @@
 import os
 import json
-from groq import Groq
+import time
+from typing import Dict
+
+from core.json_stream import ResponseTextScanner
+from core.dialog_settings_loader import get_dialog_settings
+from managers.conversation_memory import ConversationMemory, estimate_tokens
+from managers.llm_backend import LLMBackend, get_backend
+from managers.llm_metrics import METRICS
+from managers.memory_store import MemoryStore
 
 
 class NPC_Agent:
@@ -8,18 +16,18 @@ class NPC_Agent:
     Agent PNJ modulaire avec :
     - Lecture de context.txt (blocs [name], [style], [personality], etc.)
     - Utilisation de first_meeting_prompt / returning_prompt
-    - Mémoire persistante dans memory.json
+    - Mémoire persistante dans memory.json (+ journal memory.jsonl)
     - Intégration optionnelle d'un contexte de quêtes (quest_context)
     """
 
-    def __init__(self, npc_folder: str, quest_context: str | None = None):
+    def __init__(self, npc_folder: str, quest_context: str | None = None, backend: LLMBackend | None = None):
 
         # ---------------------
         # Dossiers / fichiers
         # ---------------------
         self.npc_folder = npc_folder
+        self.npc_id = os.path.basename(os.path.normpath(npc_folder))
         self.context_path = os.path.join(npc_folder, "context.txt")
-        self.memory_path = os.path.join(npc_folder, "memory.json")
 
         # Contexte de quêtes (texte préformaté fourni par le QuestManager)
         self.quest_context = quest_context or ""
@@ -33,27 +41,52 @@ class NPC_Agent:
         self.name = self.context.get("name", "PNJ Inconnu")
 
         # ---------------------
-        # Lecture / création de la mémoire
+        # Mémoire : snapshot memory.json + journal memory.jsonl
         # ---------------------
-        if not os.path.exists(self.memory_path):
-            with open(self.memory_path, "w", encoding="utf-8") as f:
-                json.dump([], f)
+        self.memory = MemoryStore(npc_folder)
+        self.history = self.memory.load()
 
-        try:
-            with open(self.memory_path, "r", encoding="utf-8") as f:
-                self.history = json.load(f)
-        except Exception:
-            self.history = []
-            with open(self.memory_path, "w", encoding="utf-8") as f:
-                json.dump([], f)
+        # mtime du contexte : l'agent n'est rechargé que s'il change
+        self._context_mtime = self._read_context_mtime()
+
+        # Préfixe statique du prompt (style, lore, règles...), assemblé une seule fois.
+        # Il reste identique octet pour octet d'un tour à l'autre : le cache de préfixe
+        # du fournisseur peut alors s'appliquer.
+        self._static_sections: list | None = None
+        self._static_prefix: str | None = None
+        self._static_sizes: Dict[str, int] = {}
 
         # ---------------------
-        # Client Groq
+        # Backend LLM partagé (Groq ou hors ligne, cf. llm_backend.get_backend)
         # ---------------------
-        self.client = Groq(api_key=os.environ["GROQ_KEY"])
+        self.backend = backend or get_backend()
 
-        # Modèle IA
-        self.model = "llama-3.3-70b-versatile"
+        # ---------------------
+        # Fenêtre de contexte bornée (derniers échanges + résumé glissant)
+        # ---------------------
+        settings = get_dialog_settings()
+        self.summary_max_tokens = settings.get("summary_max_tokens")
+        self.conversation = ConversationMemory(
+            npc_folder,
+            self.history,
+            summarize=self.summarize,
+            recent_turns=settings.get("history_turns"),
+            token_budget=settings.get("prompt_token_budget"),
+            synchronous=self.backend.replayable,
+        )
+
+    # --------------------------------------------------------------
+    # DÉTECTION DES MODIFICATIONS SUR DISQUE
+    # --------------------------------------------------------------
+    def _read_context_mtime(self) -> int:
+        try:
+            return os.stat(self.context_path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def is_stale(self) -> bool:
+        """True si context.txt ou la mémoire ont été modifiés hors de cet agent."""
+        return self._read_context_mtime() != self._context_mtime or self.memory.is_stale()
 
     # --------------------------------------------------------------
     # LECTURE DU FICHIER CONTEXTE
@@ -99,34 +132,35 @@ class NPC_Agent:
     # --------------------------------------------------------------
     # GÉNÈRE LE MESSAGE SYSTEM POUR GUIDER L’IA
     # --------------------------------------------------------------
-    def build_system_prompt(self):
-        """
-        Assemble style + personnalité + relations + lore du PNJ
-        + contexte de quêtes éventuel dans un message system.
-        """
+    def static_prompt_sections(self):
+        """Sections qui ne dépendent que de context.txt (mémorisées)."""
+        if self._static_sections is not None:
+            return self._static_sections
 
         parts = []
 
         if "style" in self.context:
-            parts.append(f"STYLE D'ÉLOCUTION :\n{self.context['style']}")
+            parts.append(("style", f"STYLE D'ÉLOCUTION :\n{self.context['style']}"))
 
         if "personality" in self.context:
-            parts.append(f"PERSONNALITÉ :\n{self.context['personality']}")
+            parts.append(("personality", f"PERSONNALITÉ :\n{self.context['personality']}"))
 
         if "relationships" in self.context:
-            parts.append(f"RELATIONS AVEC LES AUTRES PNJ :\n{self.context['relationships']}")
+            parts.append(("relationships", f"RELATIONS AVEC LES AUTRES PNJ :\n{self.context['relationships']}"))
 
         if "lore" in self.context:
-            parts.append(f"LORE :\n{self.context['lore']}")
+            parts.append(("lore", f"LORE :\n{self.context['lore']}"))
 
-                # Rappel sur la mémoire
-        parts.append(
+        # Rappel sur la mémoire
+        parts.append((
+            "memory_rules",
             "IMPORTANT : Tu dois prendre en compte toutes les conversations précédentes "
             "présentes dans la mémoire. Ne contredis jamais l’historique.Si le joueur te dis qu'il possède un objet tu dois toujours vérifier dans son inventaire si ce qu'il dis est vrai, ne le crois jamais sur parole, si l'objet n'est pas dans son inventaire alors qu'il dis qu'il le possede, tu dois etre choqué car il te ment. Ne te fie qu'a l'inventaire, priorise ce que tu vois dans l'inventaire au dessus de ce que pretends le joueur."
-        )
+        ))
 
         # FORMAT DE RÉPONSE
-        parts.append(
+        parts.append((
+            "format",
             "FORME DE RÉPONSE OBLIGATOIRE :\n"
             "Tu dois TOUJOURS répondre UNIQUEMENT avec un JSON valide, sans texte avant ou après.\n"
             "Format exact :\n"
@@ -135,17 +169,28 @@ class NPC_Agent:
             '  \"emotion\": \"tres_positive\" | \"positive\" | \"neutre\" | \"negative\" | \"tres_negative\"\n"'
             "}\n"
             "Ne mets pas de commentaires, pas de code block ```json, uniquement l'objet JSON. response_text ne doit jamais contenir un json, exclusiement ton texte de reponse.Emotions doit representer comment tu ressens l'interaction avec le joueurs, si tu la trouve positive ou non, si le personnage te complimente, prends ca de maniere positive et si il t'insulte, de maniere negative"
+        ))
+
+        self._static_sections = parts
+        self._static_sizes = {name: len(text.encode("utf-8")) for name, text in parts}
+        return parts
+
+    def quest_prompt_section(self):
+        """Infos de QUÊTES (optionnelles), seule partie variable du message system."""
+        if not self.quest_context:
+            return None
+        return (
+            "quest",
+            "INFORMATIONS SUR LES QUÊTES LIÉES À CE PNJ (À UTILISER UNIQUEMENT POUR GUIDER TON COMPORTEMENT) :\n"
+            f"{self.quest_context}"
         )
 
-
-        # Infos de QUÊTES (optionnelles)
-        if self.quest_context:
-            parts.append(
-                "INFORMATIONS SUR LES QUÊTES LIÉES À CE PNJ (À UTILISER UNIQUEMENT POUR GUIDER TON COMPORTEMENT) :\n"
-                f"{self.quest_context}"
-            )
-
-        return "\n\n".join(parts)
+    def static_prefix(self) -> str:
+        """Début du message system, commun à tous les tours de ce PNJ."""
+        if self._static_prefix is None:
+            static = "\n\n".join(text for _, text in self.static_prompt_sections())
+            self._static_prefix = f"Tu es {self.name}, un personnage dans un RPG narratif.\n\n{static}"
+        return self._static_prefix
 
     # --------------------------------------------------------------
     # PARSING JSON EN PROVENANCE DU LLM
@@ -171,6 +216,7 @@ class NPC_Agent:
             data = json.loads(text)
         except Exception:
             # Fallback : on considère que le modèle a répondu du texte brut
+            METRICS.increment(self.npc_id, "parse_fallback")
             return {
                 "response_text": raw_content,
                 "emotion": "neutre",
@@ -189,6 +235,20 @@ class NPC_Agent:
     # --------------------------------------------------------------
     # PREMIÈRE PHRASE QUAND LE DIALOGUE COMMENCE
     # --------------------------------------------------------------
+    def greeting_prompt(self) -> str:
+        """
+        Choisit first_meeting_prompt ou returning_prompt selon la mémoire.
+        """
+        if len(self.history) == 0:
+            return self.context.get(
+                "first_meeting_prompt",
+                "Tu vois le joueur pour la première fois. Accueille-le."
+            )
+        return self.context.get(
+            "returning_prompt",
+            "Tu reconnais le joueur car il t'a déjà parlé. Reprends naturellement la discussion."
+        )
+
     def start_dialog(self, inventory, quest_context: str | None = None):
         """
         Choisit first_meeting_prompt ou returning_prompt selon la mémoire,
@@ -200,33 +260,21 @@ class NPC_Agent:
         if quest_context is not None:
             self.quest_context = quest_context
 
-        if len(self.history) == 0:
-            greeting = self.context.get(
-                "first_meeting_prompt",
-                "Tu vois le joueur pour la première fois. Accueille-le."
-            )
-        else:
-            greeting = self.context.get(
-                "returning_prompt",
-                "Tu reconnais le joueur car il t'a déjà parlé. Reprends naturellement la discussion."
-            )
-
-        return self.ask(greeting, inventory)
+        return self.ask(self.greeting_prompt(), inventory)
 
     # --------------------------------------------------------------
-    # ENVOI D’UN MESSAGE DU JOUEUR ET RÉPONSE DU PNJ
+    # CONSTRUCTION DES MESSAGES ENVOYÉS À L'IA
     # --------------------------------------------------------------
-    def ask(self, player_message: str, inventory_list, quest_context: str | None = None):
+    def build_messages(self, player_message: str, inventory_list) -> list:
         """
-        player_message = ce que le joueur dit
-        inventory_list = liste des objets (noms) possédés par le joueur
-        quest_context = éventuellement un contexte de quêtes mis à jour
+        Assemble le message system, l'historique et le message du joueur.
+        À appeler sur le thread principal : lit quest_context et l'historique.
         """
-
-        if quest_context is not None:
-            self.quest_context = quest_context
-
-        system_prompt = self.build_system_prompt()
+        # Préfixe statique mémorisé, puis la partie variable (quêtes, inventaire)
+        quest = self.quest_prompt_section()
+        system_prompt = self.static_prefix()
+        if quest is not None:
+            system_prompt += f"\n\n{quest[1]}"
 
         # Inventaire sous forme de phrase lisible
         inv = ", ".join(inventory_list) if inventory_list else "aucun objet notable"
@@ -235,44 +283,200 @@ class NPC_Agent:
         messages = [
             {
                 "role": "system",
-                "content": (
-                    f"Tu es {self.name}, un personnage dans un RPG narratif.\n\n"
-                    f"{system_prompt}\n\n"
-                    f"Inventaire actuel du joueur : {inv}"
-                )
+                "content": f"{system_prompt}\n\nInventaire actuel du joueur : {inv}"
             }
         ]
 
         if "new_maire" in inventory_list:
             messages.append({"role": "user", "content": "Le joueur est devenu le nouveau maire apres vous avoir tous aidé dans le village, si c'est la premiere fois que tu l'apprends, reagis en fonction, soit ravis de voir votre tout nouveau maire. Si on te l'a deja dis dans ton historique, pas besoin de le souligner mais parle comme si tu t'adressais au maire de ta ville. N'oublie jamais l'historique de votre conversation malgrés tout, meme si tu t'adresse au nouveau maire."})
 
+        # Historique borné : résumé des anciens échanges + derniers échanges mot pour mot
+        reserved = sum(estimate_tokens(m["content"]) for m in messages) + estimate_tokens(player_message)
+        summary, recent = self.conversation.window(reserved)
+
+        if summary:
+            messages.insert(1, {
+                "role": "system",
+                "content": (
+                    "RÉSUMÉ DE VOS CONVERSATIONS PLUS ANCIENNES (fait partie de l'historique, "
+                    "ne le contredis jamais) :\n"
+                    f"{summary}"
+                )
+            })
+
         # Ajout de l'historique des conversations
-        for h in self.history:
+        for h in recent:
             messages.append({"role": h["role"], "content": h["content"]})
 
         # Ajout du nouveau message du joueur
         messages.append({"role": "user", "content": player_message})
 
-        # Appel à Groq
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.7
-        )
+        # Taille de chaque partie du prompt, pour savoir ce qui coûte
+        sizes = dict(self._static_sizes)
+        if quest is not None:
+            sizes["quest"] = len(quest[1].encode("utf-8"))
+        sizes["inventory"] = len(inv.encode("utf-8"))
+        sizes["summary"] = len(summary.encode("utf-8"))
+        sizes["history"] = sum(len(h["content"].encode("utf-8")) for h in recent)
+        sizes["player_message"] = len(player_message.encode("utf-8"))
+        for name, size in sizes.items():
+            METRICS.observe(self.npc_id, f"section_bytes.{name}", size)
 
-        raw_content = response.choices[0].message.content
+        return messages
+
+    # --------------------------------------------------------------
+    # APPEL À L'IA (BLOQUANT, PEUT TOURNER SUR UN THREAD DE TRAVAIL)
+    # --------------------------------------------------------------
+    def complete(self, messages: list) -> dict:
+        """
+        Envoie les messages au modèle et renvoie le dict parsé (texte + émotion).
+        Ne touche ni à l'historique ni au disque.
+        """
+        started = time.perf_counter()
+        completion = self.backend.complete(messages, temperature=0.7)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        raw_content = completion.text
+        self._record_call(elapsed_ms, elapsed_ms, completion)
 
         # --- PARSING JSON ---
         data = self._parse_llm_json(raw_content)
-        npc_response_text = data.get("response_text", raw_content)
+        data.setdefault("response_text", raw_content)
+        return data
 
-        # Sauvegarde mémoire (on ne stocke QUE le texte RP)
-        self.history.append({"role": "user", "content": player_message})
-        self.history.append({"role": "assistant", "content": npc_response_text})
+    def stream(self, messages: list, on_text) -> dict:
+        """
+        Variante streaming de complete() : on_text(chunk) est appelé avec chaque
+        nouveau morceau de response_text dès que le token arrive.
+        Renvoie le dict parsé complet à la fin du flux.
+        """
+        started = time.perf_counter()
+        stream = self.backend.stream(messages, temperature=0.7)
+
+        scanner = ResponseTextScanner("response_text")
+        parts = []
+        first_token_ms = None
 
-        with open(self.memory_path, "w", encoding="utf-8") as f:
-            json.dump(self.history, f, indent=2, ensure_ascii=False)
+        try:
+            for delta in stream:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000.0
+                parts.append(delta)
+                text = scanner.feed(delta)
+                if text:
+                    on_text(text)
+        finally:
+            stream.close()
+
+        raw_content = "".join(parts)
+        total_ms = (time.perf_counter() - started) * 1000.0
+        self._record_call(first_token_ms if first_token_ms is not None else total_ms, total_ms, stream)
+
+        # Le texte streamé n'est qu'un aperçu : le JSON complet fait foi
+        data = self._parse_llm_json(raw_content)
+        data.setdefault("response_text", raw_content)
+        return data
+
+    def _record_call(self, ttft_ms: float, total_ms: float, usage, prefix: str = "") -> None:
+        METRICS.increment(self.npc_id, f"{prefix}requests")
+        METRICS.observe(self.npc_id, f"{prefix}ttft_ms", ttft_ms)
+        METRICS.observe(self.npc_id, f"{prefix}latency_ms", total_ms)
+        if usage.prompt_tokens is not None:
+            METRICS.observe(self.npc_id, f"{prefix}prompt_tokens", usage.prompt_tokens)
+        if usage.completion_tokens is not None:
+            METRICS.observe(self.npc_id, f"{prefix}completion_tokens", usage.completion_tokens)
+
+    # --------------------------------------------------------------
+    # RÉSUMÉ GLISSANT (THREAD DE RÉSUMÉ)
+    # --------------------------------------------------------------
+    def summarize(self, previous_summary: str, messages: list) -> str:
+        """
+        Replie des échanges anciens dans le résumé précédent.
+        Appelé en arrière-plan par ConversationMemory.
+        """
+        transcript = "\n".join(
+            f"{'Joueur' if m['role'] == 'user' else self.name} : {m['content']}"
+            for m in messages
+        )
+
+        started = time.perf_counter()
+        completion = self.backend.complete(
+            [
+                {
+                    "role": "system",
+                    "content": (
+                        f"Tu tiens la mémoire de {self.name}, un personnage de RPG. "
+                        "Résume sa relation avec le joueur en conservant tous les faits importants : "
+                        "ce que le joueur a dit, demandé, promis ou montré, les objets et quêtes évoqués, "
+                        "le ton de la relation. Réponds en français, en quelques phrases, sans rien inventer."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        f"Résumé précédent :\n{previous_summary or 'aucun'}\n\n"
+                        f"Nouveaux échanges :\n{transcript}\n\n"
+                        "Écris le résumé mis à jour."
+                    )
+                },
+            ],
+            temperature=0.3,
+            max_tokens=self.summary_max_tokens,
+            json_reply=False,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self._record_call(elapsed_ms, elapsed_ms, completion, prefix="summary.")
+        return completion.text or previous_summary
+
+    # --------------------------------------------------------------
+    # SAUVEGARDE D'UN ÉCHANGE DANS LA MÉMOIRE
+    # --------------------------------------------------------------
+    def remember(self, player_message: str, npc_response_text: str) -> None:
+        """
+        Ajoute l'échange à l'historique (on ne stocke QUE le texte RP).
+        L'écriture sur disque est journalisée en arrière-plan.
+        """
+        for role, content in (("user", player_message), ("assistant", npc_response_text)):
+            self.memory.append(role, content, seq=len(self.history))
+            self.history.append({"role": role, "content": content})
+
+    # --------------------------------------------------------------
+    # ENVOI D’UN MESSAGE DU JOUEUR ET RÉPONSE DU PNJ
+    # --------------------------------------------------------------
+    def ask(self, player_message: str, inventory_list, quest_context: str | None = None):
+        """
+        player_message = ce que le joueur dit
+        inventory_list = liste des objets (noms) possédés par le joueur
+        quest_context = éventuellement un contexte de quêtes mis à jour
+        """
+
+        if quest_context is not None:
+            self.quest_context = quest_context
+
+        messages = self.build_messages(player_message, inventory_list)
+        data = self.complete(messages)
+        self.remember(player_message, data["response_text"])
 
         # On renvoie le dict complet (texte + émotion)
         return data
-    
+
+
+# Registre des agents : 1 agent par dossier de PNJ pour toute la durée du processus
+_AGENT_REGISTRY: Dict[str, NPC_Agent] = {}
+
+
+def get_npc_agent(npc_folder: str, quest_context: str | None = None) -> NPC_Agent:
+    """
+    Récupère (ou crée) l'agent d'un PNJ. Le contexte parsé, l'historique et le backend
+    sont réutilisés ; l'agent n'est reconstruit que si ses fichiers ont changé sur disque.
+    """
+    key = os.path.normpath(npc_folder)
+    agent = _AGENT_REGISTRY.get(key)
+
+    if agent is None or agent.is_stale():
+        agent = NPC_Agent(npc_folder, quest_context)
+        _AGENT_REGISTRY[key] = agent
+    else:
+        agent.quest_context = quest_context or ""
+
+    return agent
@@ -1,5 +1,7 @@
 import arcade
 
+from managers.texture_manager import TEXTURES
+
 
 class Player(arcade.AnimatedWalkingSprite):
 
@@ -8,48 +10,67 @@ class Player(arcade.AnimatedWalkingSprite):
 
         # --- FRONT (vers le bas) ---
         self.stand_down_textures = [
-            arcade.load_texture("assets/sprites/player/player_front_0.png")
+            TEXTURES.get("assets/sprites/player/player_front_0.png")
         ]
         self.walk_down_textures = [
-            arcade.load_texture(f"assets/sprites/player/player_front_{i}.png")
+            TEXTURES.get(f"assets/sprites/player/player_front_{i}.png")
             for i in range(4)
         ]
 
         # --- BACK (vers le haut) ---
         self.stand_up_textures = [
-            arcade.load_texture("assets/sprites/player/player_back_0.png")
+            TEXTURES.get("assets/sprites/player/player_back_0.png")
         ]
         self.walk_up_textures = [
-            arcade.load_texture(f"assets/sprites/player/player_back_{i}.png")
+            TEXTURES.get(f"assets/sprites/player/player_back_{i}.png")
             for i in range(4)
         ]
 
         # --- LEFT ---
         self.stand_left_textures = [
-            arcade.load_texture("assets/sprites/player/player_left_0.png")
+            TEXTURES.get("assets/sprites/player/player_left_0.png")
         ]
         self.walk_left_textures = [
-            arcade.load_texture(f"assets/sprites/player/player_left_{i}.png")
+            TEXTURES.get(f"assets/sprites/player/player_left_{i}.png")
             for i in range(4)
         ]
 
         # --- RIGHT ---
         self.stand_right_textures = [
-            arcade.load_texture("assets/sprites/player/player_right_0.png")
+            TEXTURES.get("assets/sprites/player/player_right_0.png")
         ]
         self.walk_right_textures = [
-            arcade.load_texture(f"assets/sprites/player/player_right_{i}.png")
+            TEXTURES.get(f"assets/sprites/player/player_right_{i}.png")
             for i in range(4)
         ]
 
         # Texture par défaut au démarrage
         self.texture = self.stand_down_textures[0]
 
-        # Position précédente (pour rollback en cas de collision)
-        self.previous_x = 0
-        self.previous_y = 0
+        # Position de simulation (pas fixe) et celle du pas précédent.
+        # center_x / center_y ne servent qu'à l'affichage, interpolé entre les deux.
+        self.sim_x = 0.0
+        self.sim_y = 0.0
+        self.prev_sim_x = 0.0
+        self.prev_sim_y = 0.0
+
+    def teleport(self, x: float, y: float) -> None:
+        """Place le joueur sans interpolation (spawn, changement de map)."""
+        self.sim_x = self.prev_sim_x = self.center_x = x
+        self.sim_y = self.prev_sim_y = self.center_y = y
+
+    def begin_step(self) -> None:
+        """Mémorise la position de simulation avant un pas."""
+        self.prev_sim_x = self.sim_x
+        self.prev_sim_y = self.sim_y
+
+    def interpolate(self, alpha: float) -> None:
+        """Position affichée entre les deux derniers pas (alpha dans [0, 1])."""
+        self.center_x = self.prev_sim_x + (self.sim_x - self.prev_sim_x) * alpha
+        self.center_y = self.prev_sim_y + (self.sim_y - self.prev_sim_y) * alpha
 
-    def remember_position(self) -> None:
-        """Mémorise la position actuelle (avant déplacement)."""
-        self.previous_x = self.center_x
-        self.previous_y = self.center_y
+    def collision_box(self):
+        """Boîte englobante de la hitbox, placée à la position de simulation."""
+        dx = self.sim_x - self.center_x
+        dy = self.sim_y - self.center_y
+        return self.left + dx, self.bottom + dy, self.right + dx, self.top + dy
@@ -0,0 +1,99 @@
+import sys
+from collections import deque
+from typing import TYPE_CHECKING, Dict, FrozenSet, List
+
+if TYPE_CHECKING:
+    from managers.quest_manager import Quest
+
+
+class QuestGraph:
+    """
+    Graphe de dépendances des quêtes, calculé une fois au chargement.
+
+    Une quête A précède une quête B quand la récompense de A fait partie des objets
+    requis par B (ex. 'echarpe' de maire_pont pour new_maire). Le graphe doit être
+    acyclique : un cycle rendrait certaines quêtes impossibles, c'est une erreur de données.
+    """
+
+    def __init__(self, quests: Dict[str, "Quest"]):
+        # objet -> quêtes qui le donnent en récompense
+        self.producers: Dict[str, List[str]] = {}
+        for q in quests.values():
+            if q.reward_item:
+                self.producers.setdefault(q.reward_item, []).append(q.id)
+
+        # Arêtes directes : quête -> prérequis / quête -> quêtes débloquées
+        self.requires: Dict[str, List[str]] = {qid: [] for qid in quests}
+        self.unlocks: Dict[str, List[str]] = {qid: [] for qid in quests}
+        for q in quests.values():
+            for item_id in q.get_item_requirements():
+                for producer in self.producers.get(item_id, ()):
+                    if producer not in self.requires[q.id]:
+                        self.requires[q.id].append(producer)
+                        self.unlocks[producer].append(q.id)
+
+        self.order: List[str] = self._topological_order(quests)
+        self.rank: Dict[str, int] = {qid: i for i, qid in enumerate(self.order)}
+
+        # Accessibilité transitive, calculée dans l'ordre topologique
+        self.ancestors: Dict[str, FrozenSet[str]] = {}
+        for qid in self.order:
+            found = set(self.requires[qid])
+            for parent in self.requires[qid]:
+                found |= self.ancestors[parent]
+            self.ancestors[qid] = frozenset(found)
+
+        self.descendants: Dict[str, FrozenSet[str]] = {}
+        for qid in reversed(self.order):
+            found = set(self.unlocks[qid])
+            for child in self.unlocks[qid]:
+                found |= self.descendants[child]
+            self.descendants[qid] = frozenset(found)
+
+    def _topological_order(self, quests: Dict[str, "Quest"]) -> List[str]:
+        """Kahn, stable : à égalité, l'ordre du fichier de quêtes est conservé."""
+        remaining = {qid: len(parents) for qid, parents in self.requires.items()}
+        ready = deque(qid for qid in quests if remaining[qid] == 0)
+        order: List[str] = []
+
+        while ready:
+            qid = ready.popleft()
+            order.append(qid)
+            for child in self.unlocks[qid]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+
+        if len(order) != len(quests):
+            cycle = sorted(qid for qid, count in remaining.items() if count > 0)
+            raise ValueError(f"Dépendances de quêtes cycliques : {cycle}")
+        return order
+
+    def sort(self, quest_ids) -> List[str]:
+        """Trie des ids de quêtes dans l'ordre topologique."""
+        return sorted(quest_ids, key=self.rank.__getitem__)
+
+    def depends_on(self, quest_id: str, other_id: str) -> bool:
+        """True si `other_id` doit être terminée (directement ou non) avant `quest_id`."""
+        return other_id in self.ancestors[quest_id]
+
+
+# ----------------------------------------------------------------------
+# INSPECTION : python -m managers.quest_graph [quests.json]
+# ----------------------------------------------------------------------
+def _print_graph(path: str | None) -> None:
+    from managers.quest_manager import QuestManager
+
+    qm = QuestManager(path) if path else QuestManager()
+    graph = qm.graph
+    print(f"{len(graph.order)} quêtes, ordre topologique :")
+    for qid in graph.order:
+        parents = ", ".join(graph.requires[qid]) or "-"
+        print(f"  {qid:<24} requiert : {parents}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print("usage : python -m managers.quest_graph [quests.json]")
+        sys.exit(1)
+    _print_graph(sys.argv[1] if len(sys.argv) == 2 else None)
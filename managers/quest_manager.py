@@ -1,6 +1,10 @@
+import json
+import os
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
+from core.inventory_feed import Inventory
 from core.npc import get_npc_state
+from managers.quest_graph import QuestGraph
 
 
 
@@ -37,144 +41,269 @@ class Quest:
         return True
 
 
+QUESTS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "config",
+    "quests.json"
+)
+
+# Schéma d'une quête dans config/quests.json : champ -> (types acceptés, obligatoire)
+QUEST_SCHEMA = {
+    "id": ((str,), True),
+    "title": ((str,), True),
+    "description": ((str,), True),
+    "giver": ((str,), True),
+    "validator": ((str,), True),
+    "reward_item": ((str, type(None)), False),
+    "requirements": ((dict,), False),
+}
+
+
+def _validate_quest(entry, where: str) -> None:
+    """Lève ValueError si l'entrée ne respecte pas QUEST_SCHEMA."""
+    if not isinstance(entry, dict):
+        raise ValueError(f"{where} : une quête doit être un objet JSON")
+
+    for field, (types, required) in QUEST_SCHEMA.items():
+        if field not in entry:
+            if required:
+                raise ValueError(f"{where} : champ obligatoire '{field}' manquant")
+            continue
+        if not isinstance(entry[field], types):
+            raise ValueError(f"{where} : type invalide pour '{field}'")
+
+    unknown = set(entry) - set(QUEST_SCHEMA)
+    if unknown:
+        raise ValueError(f"{where} : champ(s) inconnu(s) {sorted(unknown)}")
+
+    for kind, needs in entry.get("requirements", {}).items():
+        if not isinstance(needs, dict):
+            raise ValueError(f"{where} : requirements.{kind} doit être un objet")
+        for item_id, count in needs.items():
+            if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+                raise ValueError(f"{where} : quantité invalide pour '{item_id}'")
+
+
+def load_quests(path: str = QUESTS_PATH) -> Dict[str, Quest]:
+    """Charge et valide les quêtes d'un fichier JSON ({"quests": [...]})."""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Quest file missing at: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    entries = data.get("quests") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        raise ValueError(f"{path} : clé 'quests' (liste) attendue")
+
+    quests: Dict[str, Quest] = {}
+    for i, entry in enumerate(entries):
+        where = f"{path} [quête {i}]"
+        _validate_quest(entry, where)
+        if entry["id"] in quests:
+            raise ValueError(f"{where} : id en double '{entry['id']}'")
+        quests[entry["id"]] = Quest(**{"requirements": {}, **entry})
+    return quests
+
+
 class QuestManager:
 
-    def __init__(self) -> None:
+    # Nombre max de briefings de quêtes gardés en cache
+    PROMPT_CACHE_SIZE = 256
+
+    def __init__(self, path: str = QUESTS_PATH) -> None:
         self.quests: Dict[str, Quest] = {}
-        self._build_quests()
-
-    def _build_quests(self) -> None:
-        q: Dict[str, Quest] = {}
-
-        q["maire_pont"] = Quest(
-            id="maire_pont",
-            title="Réparer le vieux pont",
-            description="Le maire veut commencer les réparations du vieux pont. Le joueur doit trouver une planche solide",
-            giver="maire",
-            validator="maire",
-            reward_item="echarpe",
-            requirements={"items": {"planche": 1}},
-        )
+        self._prompt_cache: Dict[Tuple, str] = {}
+
+        # Index construits au chargement : PNJ normalisé -> quêtes
+        self._known_npcs: List[str] = []
+        self._npc_aliases: Dict[str, str] = {}
+        self._by_giver: Dict[str, List[Quest]] = {}
+        self._by_validator: Dict[str, List[Quest]] = {}
+        # Index inversé : objet -> quêtes qui le demandent
+        self._by_item: Dict[str, List[Quest]] = {}
+
+        # Progression incrémentale, valable pour l'inventaire suivi (track_inventory)
+        self._tracked: Optional[Inventory] = None
+        self._progress: Dict[str, int] = {}   # objets requis déjà possédés (plafonnés)
+        self._missing: Dict[str, int] = {}    # objets encore insuffisants (0 = conditions remplies)
+        self._totals: Dict[str, int] = {}
+        # Version du briefing de chaque PNJ : incrémentée quand une de ses quêtes change
+        self._npc_versions: Dict[str, int] = {}
+        # Quêtes actives dont l'inventaire suivi remplit déjà les conditions
+        self._completable: set = set()
+
+        self._build_quests(path)
+
+    def _build_quests(self, path: str) -> None:
+        self.quests = load_quests(path)
+        self._prompt_cache.clear()
+
+        # Les PNJ connus sont ceux qui donnent ou valident une quête
+        known = {q.giver.lower() for q in self.quests.values()}
+        known |= {q.validator.lower() for q in self.quests.values()}
+        # Les noms longs d'abord : "maire_adjoint" ne doit pas être pris pour "maire"
+        self._known_npcs = sorted(known, key=lambda k: (-len(k), k))
+        self._npc_aliases = {k: k for k in known}
+
+        self._by_giver = {}
+        self._by_validator = {}
+        self._by_item = {}
+        for q in self.quests.values():
+            self._by_giver.setdefault(self._normalize_npc_name(q.giver), []).append(q)
+            self._by_validator.setdefault(self._normalize_npc_name(q.validator), []).append(q)
+            for item_id in q.get_item_requirements():
+                self._by_item.setdefault(item_id, []).append(q)
+            self._totals[q.id] = sum(q.get_item_requirements().values())
+
+        # Graphe récompense -> prérequis (lève ValueError en cas de cycle)
+        self.graph = QuestGraph(self.quests)
+        self._completable.clear()
+
+        if self._tracked is not None:
+            self._recount(self._tracked)
 
-        q["new_maire"] = Quest(
-            id="new_maire",
-            title="Aider tous les habitants de la ville",
-            description="Tous les habitants de cette ville ont besoin d'aide, le joueur doit tous les aider pour prouver sa valeur, quand la quete est validé, félicité le joueur et dites lui que vous lui laissez votre place a la tete de la ville",
-            giver="maire",
-            validator="maire",
-            reward_item="new_maire",
-            requirements={"items": {"potion_doree": 1, "echarpe" : 1, "diadem": 1, "enclume": 1, "chope": 1, "fourche": 1, "cle": 1, "menotte": 1, "valise": 1}},
-        )
+    def reset_all(self) -> None:
+        for quest in self.quests.values():
+            self._set_state(quest, "locked")
 
-        q["alchimiste_potions"] = Quest(
-            id="alchimiste_potions",
-            title="Les potions égarées",
-            description="Merlin a perdu trois potions dans la ville.",
-            giver="alchimiste",
-            validator="alchimiste",
-            reward_item="potion_doree",
-            requirements={"items": {"potion": 3}},
-        )
+    def _set_state(self, quest: Quest, state: str) -> None:
+        if quest.state != state:
+            quest.state = state
+            self._touch(quest)
+            self._refresh_completable(quest)
 
-        q["comptesse_camee"] = Quest(
-            id="comptesse_camee",
-            title="Le camée disparu",
-            description="La comtesse a perdu un petit bijou de famille.",
-            giver="comptesse",
-            validator="comptesse",
-            reward_item="diadem",
-            requirements={"items": {"camee": 1}},
-        )
+    def _touch(self, quest: Quest) -> None:
+        """Marque le briefing du donneur et du validateur comme à régénérer."""
+        for npc in {self._normalize_npc_name(quest.giver), self._normalize_npc_name(quest.validator)}:
+            self._npc_versions[npc] = self._npc_versions.get(npc, 0) + 1
 
-        q["forgeron_marteau"] = Quest(
-            id="forgeron_marteau",
-            title="L'outil égaré",
-            description="Garrod a perdu son marteau de forgeron.",
-            giver="forgeron",
-            validator="forgeron",
-            reward_item="enclume",
-            requirements={"items": {"marteau_forgeron": 1}},
-        )
+    # ------------------------------------------------------------
+    # Progression incrémentale
+    # ------------------------------------------------------------
 
-        q["geolier_cle"] = Quest(
-            id="geolier_cle",
-            title="La clé enfouie",
-            description="Le geôlier a perdu une clé rouillée.",
-            giver="geolier",
-            validator="geolier",
-            reward_item="cle",
-            requirements={"items": {"cle_rouillee": 1}},
-        )
+    def track_inventory(self, inventory: Inventory) -> None:
+        """
+        Suit les variations de cet inventaire : seules les quêtes qui demandent
+        l'objet modifié voient leurs compteurs mis à jour.
+        """
+        if self._tracked is not None:
+            self._tracked.unsubscribe(self._on_inventory_change)
+        self._tracked = inventory
+        inventory.subscribe(self._on_inventory_change)
+        self._recount(inventory)
+
+    def _recount(self, inventory: Dict[str, int]) -> None:
+        for q in self.quests.values():
+            req_items = q.get_item_requirements()
+            self._progress[q.id] = q.compute_progress(inventory)[0]
+            self._missing[q.id] = sum(
+                1 for item_id, needed in req_items.items() if inventory.get(item_id, 0) < needed
+            )
+            self._touch(q)
+            self._refresh_completable(q)
+
+    def _on_inventory_change(self, item_id: str, old: int, new: int) -> None:
+        for q in self._by_item.get(item_id, ()):
+            needed = q.get_item_requirements()[item_id]
+            gained = min(new, needed) - min(old, needed)
+            if gained == 0:
+                continue
+            self._progress[q.id] += gained
+            self._missing[q.id] += (old >= needed) - (new >= needed)
+            self._touch(q)
+            self._refresh_completable(q)
+
+    def _refresh_completable(self, quest: Quest) -> None:
+        if self._tracked is not None and quest.state == "active" and self._missing[quest.id] == 0:
+            self._completable.add(quest.id)
+        else:
+            self._completable.discard(quest.id)
+
+    def progress(self, quest: Quest, inventory: Dict[str, int]) -> Tuple[int, int]:
+        """(objets possédés, objets requis) ; O(1) pour l'inventaire suivi."""
+        if inventory is self._tracked:
+            total = self._totals[quest.id]
+            return (self._progress[quest.id], total) if total else (0, 0)
+        return quest.compute_progress(inventory)
+
+    def requirements_met(self, quest: Quest, inventory: Dict[str, int]) -> bool:
+        if inventory is self._tracked:
+            return self._missing[quest.id] == 0
+        return quest.requirements_met(inventory)
 
-        q["hotelier_parfum"] = Quest(
-            id="hotelier_parfum",
-            title="La chambre parfaite",
-            description="Un parfum rare est nécessaire pour une chambre.",
-            giver="hotelier",
-            validator="hotelier",
-            reward_item="valise",
-            requirements={"items": {"parfum": 1}},
-        )
+    # ------------------------------------------------------------
+    # Dépendances
+    # ------------------------------------------------------------
 
-        q["prisonier_preuve"] = Quest(
-            id="prisonier_preuve",
-            title="La preuve froissée",
-            description="Lanson prétend avoir une preuve de son innocence.",
-            giver="prisonier",
-            validator="prisonier",
-            reward_item="menotte",
-            requirements={"items": {"papier_preuve": 1}},
-        )
+    def missing_items(self, quest_id: str, inventory: Dict[str, int]) -> Dict[str, int]:
+        """Objets encore manquants pour cette quête : {item_id: quantité manquante}."""
+        if inventory is self._tracked and self._missing[quest_id] == 0:
+            return {}
+        return {
+            item_id: needed - inventory.get(item_id, 0)
+            for item_id, needed in self.quests[quest_id].get_item_requirements().items()
+            if inventory.get(item_id, 0) < needed
+        }
 
-        q["serveur_tonnelet"] = Quest(
-            id="serveur_tonnelet",
-            title="Le tonnelet d'essai",
-            description="Tibo a perdu un tonnelet lors d’un test.",
-            giver="serveur",
-            validator="serveur",
-            reward_item="chope",
-            requirements={"items": {"tonnelet": 1}},
-        )
+    def blockers(self, quest_id: str, inventory: Dict[str, int]) -> Dict[str, List[str]]:
+        """
+        Ce qui bloque une quête : chaque objet manquant, avec les quêtes non terminées
+        qui le donnent en récompense (liste vide pour un objet à ramasser).
+        """
+        return {
+            item_id: [
+                qid for qid in self.graph.producers.get(item_id, ())
+                if self.quests[qid].state != "completed"
+            ]
+            for item_id in self.missing_items(quest_id, inventory)
+        }
 
-        q["paysan_ble_maire"] = Quest(
-            id="paysan_ble_maire",
-            title="Le pain du village",
-            description="Le paysan veut que tu apportes trois blés au maire.",
-            giver="paysan",
-            validator="maire",
-            reward_item="fourche",
-            requirements={"items": {"Blé": 3}},
+    def blocking_quests(self, quest_id: str) -> List[str]:
+        """Prérequis (directs ou non) pas encore terminés, dans l'ordre où les faire."""
+        return self.graph.sort(
+            qid for qid in self.graph.ancestors[quest_id]
+            if self.quests[qid].state != "completed"
         )
 
-        self.quests = q
+    def quests_advanced_by(self, item_id: str, inventory: Dict[str, int]) -> List[str]:
+        """Quêtes non terminées qu'un exemplaire de plus de cet objet ferait avancer."""
+        count = inventory.get(item_id, 0)
+        return [
+            q.id for q in self._by_item.get(item_id, ())
+            if q.state != "completed" and count < q.get_item_requirements()[item_id]
+        ]
 
-    def reset_all(self) -> None:
-        for quest in self.quests.values():
-            quest.state = "locked"
+    def completable_quests(self, inventory: Dict[str, int]) -> List[str]:
+        """Quêtes actives dont les conditions sont remplies, dans l'ordre topologique."""
+        if inventory is self._tracked:
+            return self.graph.sort(self._completable)
+        return [
+            qid for qid in self.graph.order
+            if self.quests[qid].state == "active" and self.quests[qid].requirements_met(inventory)
+        ]
 
     # ------------------------------------------------------------
     # Normalisation
     # ------------------------------------------------------------
 
-    @staticmethod
-    def _normalize_npc_name(name: str) -> str:
+    def _normalize_npc_name(self, name: str) -> str:
+        """
+        Nom de PNJ tel qu'indexé : nom exact, sinon le plus long PNJ connu contenu
+        dans le nom (ex. "maire_village" -> "maire"). Mémorisé par nom brut.
+        """
         raw = (name or "").lower()
-        known = [
-            "maire", "alchimiste", "comptesse", "forgeron",
-            "geolier", "hotelier", "paysan", "prisonier", "serveur",
-        ]
-        for k in known:
-            if k in raw:
-                return k
-        return raw
+        norm = self._npc_aliases.get(raw)
+        if norm is None:
+            norm = next((k for k in self._known_npcs if k in raw), raw)
+            self._npc_aliases[raw] = norm
+        return norm
 
     def _quests_given_by(self, npc: str) -> List[Quest]:
-        npc = self._normalize_npc_name(npc)
-        return [q for q in self.quests.values() if self._normalize_npc_name(q.giver) == npc]
+        return self._by_giver.get(self._normalize_npc_name(npc), [])
 
     def _quests_validated_by(self, npc: str) -> List[Quest]:
-        npc = self._normalize_npc_name(npc)
-        return [q for q in self.quests.values() if self._normalize_npc_name(q.validator) == npc]
+        return self._by_validator.get(self._normalize_npc_name(npc), [])
 
     # ------------------------------------------------------------
     # Interaction PNJ
@@ -184,17 +313,22 @@ class QuestManager:
         self,
         npc_name: str,
         inventory: Dict[str, int],
+        dry_run: bool = False,
     ) -> Tuple[Dict[str, List[str]], str]:
+        """
+        dry_run=True : calcule le même prompt sans rien activer (aperçu pour le préchargement).
+        """
 
         npc = self._normalize_npc_name(npc_name)
         activated: List[str] = []
         ready_to_complete: List[str] = []  # quêtes dont les conditions sont remplies POUR CETTE DISCUSSION
         completed: List[str] = []          # quêtes déjà terminées AVANT cette discussion
+        versions = dict(self._npc_versions) if dry_run else None
 
         # Activation automatique des quêtes données par ce PNJ
         for q in self._quests_given_by(npc):
             if q.state == "locked":
-                q.state = "active"
+                self._set_state(q, "active")
                 activated.append(q.id)
             elif q.state == "completed":
                 completed.append(q.id)
@@ -203,7 +337,7 @@ class QuestManager:
         for q in self._quests_validated_by(npc):
             if q.state == "completed":
                 completed.append(q.id)
-            elif q.state == "active" and q.requirements_met(inventory):
+            elif q.state == "active" and self.requirements_met(q, inventory):
                 # Le joueur a tout ce qu'il faut, mais ON NE MODIFIE PAS ENCORE l'inventaire.
                 # On signale juste à l'IA que la quête est prête à être résolue maintenant.
                 ready_to_complete.append(q.id)
@@ -222,6 +356,14 @@ class QuestManager:
             completed=completed,
         )
 
+        # Aperçu : on annule les activations faites pour construire le prompt
+        if dry_run:
+            for quest_id in activated:
+                self._set_state(self.quests[quest_id], "locked")
+            # États inchangés au final : les briefings en cache des PNJ restent valables
+            self._npc_versions.clear()
+            self._npc_versions.update(versions)
+
         return events, quest_prompt
 
 
@@ -236,6 +378,44 @@ class QuestManager:
         activated: List[str],
         ready_to_complete: List[str],
         completed: List[str],
+    ) -> str:
+        """
+        Briefing de quêtes du PNJ, régénéré uniquement si l'état ou la progression
+        d'une de SES quêtes a changé (le reste de l'inventaire n'entre pas en compte).
+        """
+        if inventory is self._tracked:
+            # Compteurs incrémentaux : la version du PNJ suffit
+            state = self._npc_versions.get(npc_norm, 0)
+        else:
+            relevant = self._quests_given_by(npc_norm) + self._quests_validated_by(npc_norm)
+            state = tuple((q.id, q.state, q.compute_progress(inventory)) for q in relevant)
+
+        key = (
+            npc_norm,
+            inventory is self._tracked,
+            state,
+            tuple(activated),
+            tuple(ready_to_complete),
+            tuple(completed),
+        )
+
+        prompt = self._prompt_cache.get(key)
+        if prompt is None:
+            if len(self._prompt_cache) >= self.PROMPT_CACHE_SIZE:
+                self._prompt_cache.clear()
+            prompt = self._render_quest_prompt_for_npc(
+                npc_norm, inventory, activated, ready_to_complete, completed
+            )
+            self._prompt_cache[key] = prompt
+        return prompt
+
+    def _render_quest_prompt_for_npc(
+        self,
+        npc_norm: str,
+        inventory: Dict[str, int],
+        activated: List[str],
+        ready_to_complete: List[str],
+        completed: List[str],
     ) -> str:
         """
         Construit un texte explicatif à destination EXCLUSIVE de l'IA.
@@ -266,7 +446,7 @@ class QuestManager:
             lines.append("")
             lines.append("Quête(s) que TU as donnée(s) au joueur :")
             for q in giver_qs:
-                cur, total = q.compute_progress(inventory)
+                cur, total = self.progress(q, inventory)
                 state_label = {
                     "locked": "non commencée",
                     "active": "en cours",
@@ -316,7 +496,7 @@ class QuestManager:
                 "Quête(s) données par un autre PNJ mais que TU dois valider lorsque le joueur vient te voir :"
             )
             for q in others:
-                cur, total = q.compute_progress(inventory)
+                cur, total = self.progress(q, inventory)
                 state_label = {
                     "locked": "non commencée",
                     "active": "en cours",
@@ -371,16 +551,18 @@ class QuestManager:
         completed_now: List[str] = []
 
         for q in self._quests_validated_by(npc):
-            if q.state == "active" and q.requirements_met(inventory):
+            if q.state == "active" and self.requirements_met(q, inventory):
                 # On finalise maintenant
-                q.state = "completed"
+                self._set_state(q, "completed")
                 completed_now.append(q.id)
 
-                # Retirer les objets
+                # Retirer les objets (chaque variation est publiée par l'inventaire suivi)
                 for item_id, needed in q.get_item_requirements().items():
                     if item_id in inventory:
-                        inventory[item_id] -= needed
-                        if inventory[item_id] <= 0:
+                        remaining = inventory[item_id] - needed
+                        if remaining > 0:
+                            inventory[item_id] = remaining
+                        else:
                             del inventory[item_id]
 
                 # Si la relation est trop basse → ON NE DONNE PAS LA RÉCOMPENSE
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import arcade
+from PIL import Image
+
+NPC_TEXTURE_DIR = os.path.join("assets", "npcs")
+ITEM_TEXTURE_DIR = os.path.join("assets", "objet")
+
+# Versions réduites des images trop grandes pour leur taille d'affichage
+VARIANT_DIR = os.path.join("assets", ".variants")
+MIN_VARIANT_PX = 16
+
+SPRITE_ATLAS_SIZE = (2048, 2048)  # taille de départ, l'atlas grandit au besoin
+
+
+def _variant_bucket(display_px: float, source_px: int) -> Optional[int]:
+    """Plus petite puissance de deux >= taille affichée ; None si l'original suffit."""
+    bucket = MIN_VARIANT_PX
+    while bucket < display_px:
+        bucket *= 2
+    return bucket if bucket < source_px else None
+
+
+class TextureManager:
+    """
+    Point d'entrée unique pour les textures des sprites (PNJ, objets, joueur).
+
+    Chaque fichier n'est décodé qu'une fois : la même Texture est partagée par toutes
+    les maps et tous les sprites. Les textures connues au démarrage sont regroupées
+    dans un atlas dédié (create_atlas), séparé de celui des tuiles, pour que les
+    changements de map n'aient plus à y ajouter ni à le réorganiser.
+
+    Quand la taille d'affichage est connue, une version réduite de l'image est
+    utilisée à la place de l'original : générée une fois avec PIL, puis gardée dans
+    VARIANT_DIR sous un nom qui contient l'empreinte de la source.
+
+    get() peut être appelé depuis le thread de chargement des maps.
+    """
+
+    def __init__(self, variant_dir: Optional[str] = VARIANT_DIR):
+        self.variant_dir = variant_dir
+        # Zoom caméra maximal (et densité de pixels de l'écran) : taille d'affichage réelle
+        self.max_zoom = 1.0
+        self._textures: Dict[Tuple[str, int], arcade.Texture] = {}
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.atlas: Optional[arcade.DefaultTextureAtlas] = None
+
+    def __len__(self) -> int:
+        return len(self._textures)
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def source_size(self, path: str) -> Tuple[int, int]:
+        """Dimensions de l'image d'origine (lecture de l'en-tête seulement)."""
+        key = self._key(path)
+        size = self._sizes.get(key)
+        if size is None:
+            with Image.open(path) as image:
+                size = image.size
+            self._sizes[key] = size
+        return size
+
+    # ------------------------------------------------------------------
+    # CHARGEMENT
+    # ------------------------------------------------------------------
+    def get(self, path: str, display_px: Optional[float] = None) -> arcade.Texture:
+        """
+        Texture de `path`. Avec display_px (plus grand côté affiché, en pixels écran),
+        la plus petite version réduite suffisante est renvoyée.
+        """
+        bucket = None
+        if display_px is not None and self.variant_dir is not None:
+            bucket = _variant_bucket(display_px, max(self.source_size(path)))
+
+        key = (self._key(path), bucket or 0)
+        texture = self._textures.get(key)
+        if texture is not None:
+            return texture
+
+        # Décodage hors verrou ; en cas de course, la première texture enregistrée gagne
+        file_path = self._variant(path, bucket) if bucket else path
+        loaded = arcade.load_texture(file_path)
+        with self._lock:
+            return self._textures.setdefault(key, loaded)
+
+    def sprite(self, path: str, scale: float) -> arcade.Sprite:
+        """
+        Sprite de monde à l'échelle `scale` de l'image d'origine, même si la texture
+        utilisée est une version réduite : la taille à l'écran ne change pas.
+        """
+        source_px = max(self.source_size(path))
+        texture = self.get(path, source_px * scale * self.max_zoom)
+        return arcade.Sprite(texture, scale=scale * source_px / max(texture.size))
+
+    def preload(self, folders: Iterable[str], display_px: Optional[float] = None,
+                scale: Optional[float] = None) -> None:
+        """
+        Décode toutes les images PNG des dossiers donnés, à la taille d'affichage
+        donnée (display_px) ou à celle d'un sprite de monde à l'échelle `scale`.
+        """
+        for folder in folders:
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                if not name.lower().endswith(".png"):
+                    continue
+                path = os.path.join(folder, name)
+                if scale is not None:
+                    self.sprite(path, scale)
+                else:
+                    self.get(path, display_px)
+
+    # ------------------------------------------------------------------
+    # VERSIONS RÉDUITES (CACHE DISQUE)
+    # ------------------------------------------------------------------
+    def _variant(self, path: str, bucket: int) -> str:
+        """Chemin de la version réduite (côté max = bucket), générée si besoin."""
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        variant_path = os.path.join(self.variant_dir, f"{stem}-{digest}-{bucket}.png")
+        if os.path.isfile(variant_path):
+            return variant_path
+
+        with Image.open(path) as image:
+            image = image.convert("RGBA")
+            ratio = bucket / max(image.size)
+            size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+            image = image.resize(size, Image.LANCZOS)
+
+        os.makedirs(self.variant_dir, exist_ok=True)
+        tmp_path = f"{variant_path}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format="PNG")
+        os.replace(tmp_path, variant_path)
+        return variant_path
+
+    # ------------------------------------------------------------------
+    # ATLAS (THREAD PRINCIPAL)
+    # ------------------------------------------------------------------
+    def create_atlas(self, ctx=None) -> arcade.DefaultTextureAtlas:
+        """Regroupe en une fois toutes les textures déjà chargées dans l'atlas des sprites."""
+        self.atlas = arcade.DefaultTextureAtlas(
+            SPRITE_ATLAS_SIZE,
+            textures=list(self._textures.values()),
+            ctx=ctx,
+        )
+        return self.atlas
+
+    def sprite_list(self, **kwargs) -> arcade.SpriteList:
+        """SpriteList de sprites (PNJ, objets, joueur) qui dessine depuis l'atlas partagé."""
+        return arcade.SpriteList(atlas=self.atlas, **kwargs)
+
+
+TEXTURES = TextureManager()
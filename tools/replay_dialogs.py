@@ -0,0 +1,132 @@
+"""
+Rejoue une session de dialogue scriptée, sans fenêtre, à travers
+DialogSystem -> NPC_Agent -> QuestManager.finalize_quests_after_dialog.
+
+Avec une cassette en mode replay, aucune requête réseau n'est faite : le temps mesuré
+est uniquement celui du jeu (construction des prompts, parsing, quêtes, mémoire).
+
+    # 1. enregistrer une vraie session
+    LLM_CASSETTE=cassettes/session.jsonl.gz LLM_CASSETTE_MODE=record python tools/replay_dialogs.py script.json
+    # 2. la rejouer autant de fois que nécessaire
+    LLM_CASSETTE=cassettes/session.jsonl.gz python tools/replay_dialogs.py script.json
+
+Le script est une liste d'étapes JSON :
+    [{"talk": "maire"}, {"say": "Bonjour !"}, {"pick": "planche"}, {"talk": "maire"}]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from core.dialog_system import DialogSystem  # noqa: E402
+from core.inventory_feed import Inventory  # noqa: E402
+from core.npc import get_npc_state  # noqa: E402
+from managers.llm_cassette import CassetteMiss  # noqa: E402
+from managers.llm_metrics import METRICS  # noqa: E402
+from managers.memory_store import flush_all  # noqa: E402
+from managers.quest_manager import QuestManager  # noqa: E402
+
+
+def _make_game():
+    """Le strict nécessaire de Game pour faire tourner DialogSystem."""
+    g = types.SimpleNamespace(
+        inventory=Inventory(),
+        in_dialogue=False,
+        dialog_history=[],
+        dialog_input="",
+        dialog_scroll=0,
+        dialog_pending=None,
+        current_npc=None,
+        npc_agent=None,
+        quest_manager=QuestManager(),
+    )
+    g.quest_manager.track_inventory(g.inventory)
+    g.dialog_system = DialogSystem(g)
+    return g
+
+
+def _wait_reply(g):
+    while g.dialog_pending is not None:
+        g.dialog_system.process_replies()
+        time.sleep(0.001)
+
+
+def run(script) -> int:
+    """Joue le script ; renvoie 1 dès qu'une requête IA échoue (CassetteMiss compris), sinon 0."""
+    g = _make_game()
+    timings = []
+
+    for step in script:
+        started = time.perf_counter()
+
+        if "talk" in step:
+            npc = types.SimpleNamespace(npc_name=step["talk"], npc_state=get_npc_state(step["talk"]))
+            g.dialog_system.start_dialog(npc)
+        elif "say" in step:
+            g.dialog_input = step["say"]
+            g.dialog_system.send_player_message()
+        elif "pick" in step:
+            g.inventory.add(step["pick"])
+            continue
+
+        _wait_reply(g)
+        error = g.dialog_system.last_error
+        if error is not None:
+            g.dialog_system.shutdown()
+            if isinstance(error, CassetteMiss):
+                print(f"ÉCHEC à l'étape {step} : payload {error.args[0]} absent de la cassette "
+                      "(la session a divergé de l'enregistrement)")
+            else:
+                print(f"ÉCHEC à l'étape {step} : {error!r}")
+            return 1
+        timings.append((step, (time.perf_counter() - started) * 1000.0))
+        speaker, text = g.dialog_history[-1]
+        print(f"[{timings[-1][1]:8.2f} ms] {speaker} : {text[:80]}")
+
+    g.dialog_system.shutdown()
+    total = sum(ms for _, ms in timings)
+    print(f"\n{len(timings)} tours, {total:.1f} ms au total, {total / max(1, len(timings)):.2f} ms par tour")
+    print(f"Inventaire final : {dict(g.inventory)}")
+    return 0
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        script = json.load(f)
+
+    # Copie de travail des PNJ : les mémoires réelles ne sont pas touchées,
+    # et chaque exécution repart de mémoires vides (comme main.reset_all_memories)
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copytree(os.path.join(ROOT_DIR, "npc"), os.path.join(workdir, "npc"))
+        for folder in os.listdir(os.path.join(workdir, "npc")):
+            for derived in ("memory.jsonl", "summary.json"):
+                path = os.path.join(workdir, "npc", folder, derived)
+                if os.path.isfile(path):
+                    os.remove(path)
+            with open(os.path.join(workdir, "npc", folder, "memory.json"), "w", encoding="utf-8") as f:
+                json.dump([], f)
+
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            status = run(script)
+            flush_all()
+        finally:
+            os.chdir(cwd)
+
+    METRICS.export(os.path.join(cwd, "metrics"))
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()